@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""三元组模糊索引基准测试
+
+用法：python scripts/bench_trigram.py [工具数量] [查询次数] [名词数量]
+
+名词数量为 0 时只使用内置的 24 个名词（词汇极少、倒排表很长，属于最坏情况）；
+否则额外随机生成对应数量的名词，更接近多个真实服务混合后的词汇量。
+"""
+
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.tool_index.search_engine import TrigramIndex  # noqa: E402
+
+VERBS = ["get", "list", "create", "update", "delete", "search", "read", "write", "sync", "export"]
+NOUNS = [
+    "issue", "merge_request", "pipeline", "branch", "commit", "file", "user", "project",
+    "comment", "label", "milestone", "release", "tag", "wiki", "snippet", "runner", "job",
+    "artifact", "deployment", "environment", "variable", "webhook", "member", "group",
+]
+PARAMS = ["id", "project_id", "title", "description", "path", "ref", "page", "per_page", "state", "query"]
+
+
+def random_words(count: int, rng: random.Random) -> list:
+    """随机生成由 2~3 个音节组成的单词"""
+    syllables = [c + v for c in "bcdfghjklmnprstvwz" for v in "aeiou"]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.choice((2, 3)))))
+    return sorted(words)
+
+
+def typo(text: str, rng: random.Random) -> str:
+    """随机删除一个字符，模拟拼写错误"""
+    if len(text) < 4:
+        return text
+    position = rng.randrange(1, len(text) - 1)
+    return text[:position] + text[position + 1:]
+
+
+def main() -> None:
+    tool_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    noun_count = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    rng = random.Random(42)
+    nouns_pool = NOUNS + random_words(noun_count, rng)
+
+    # 每个服务约 50 个工具，名称由动词 + 1~2 个名词组成（服务之间部分重名）
+    tools = []
+    while len(tools) < tool_count:
+        service = f"svc{len(tools) // 50}"
+        nouns = rng.sample(nouns_pool, rng.choice((1, 2)))
+        name = "_".join([rng.choice(VERBS)] + nouns)
+        tools.append((f"{service}_{name}", name, rng.sample(PARAMS, 3)))
+
+    index = TrigramIndex()
+    started = time.perf_counter()
+    for display_name, name, params in tools:
+        index.add(display_name, [name], params)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    queries = [typo(rng.choice(tools)[1], rng) for _ in range(query_count)]
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+
+    print(f"工具数量: {len(tools)}，名词: {len(nouns_pool)}，不同标识符: {len(index._term_ids)}，词: {len(index._word_ids)}")
+    print(f"构建耗时: {build_ms:.1f} ms")
+    print(
+        f"查询 {query_count} 次: p50 {statistics.median(latencies):.3f} ms，"
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.3f} ms，"
+        f"max {latencies[-1]:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
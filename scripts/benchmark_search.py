@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""工具搜索基准测试（合成工具目录）
+
+按不同规模生成合成工具目录（中英文混合描述、真实形态的参数 schema），对各个搜索引擎测量：
+索引构建耗时、新增/移除单个服务耗时、查询延迟 p50/p99、每个工具的内存占用。
+结果写入 JSON 文件，便于对比不同版本。
+
+用法：
+    python scripts/benchmark_search.py --sizes 100,1000,10000 --engines simple,whoosh,bm25 \\
+        --output bench_results.json
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from mcp.types import Tool  # noqa: E402
+
+from src.tool_index.manager import ToolIndexManager  # noqa: E402
+
+TOOLS_PER_SERVICE = 50
+
+VERBS = ["get", "list", "create", "update", "delete", "search", "read", "write", "sync", "export", "import", "run"]
+NOUNS = [
+    "issue", "merge_request", "pipeline", "branch", "commit", "file", "user", "project", "comment",
+    "label", "milestone", "release", "tag", "wiki", "job", "artifact", "deployment", "variable",
+    "webhook", "member", "group", "document", "table", "record", "message", "channel", "event",
+    "calendar", "task", "ticket", "invoice", "order", "customer", "report", "dashboard", "metric",
+]
+ENGLISH_PHRASES = [
+    "with pagination support", "for the given project", "by identifier", "and return the result",
+    "from the remote server", "using the current credentials", "in the selected workspace",
+]
+CHINESE_VERBS = ["查询", "获取", "创建", "更新", "删除", "搜索", "读取", "写入", "同步", "导出"]
+CHINESE_NOUNS = [
+    "需求", "缺陷", "任务", "迭代", "文档", "表格", "消息", "群组", "日程", "审批",
+    "订单", "客户", "报表", "指标", "工单", "发票", "用户", "项目", "代码分支", "合并请求",
+]
+CHINESE_PHRASES = ["支持分页", "按标识查询", "返回详细信息", "需要登录凭证", "适用于当前工作空间"]
+PARAM_NAMES = [
+    ("id", "integer", "资源 ID"), ("project_id", "string", "Project identifier"),
+    ("title", "string", "Title"), ("description", "string", "描述内容"), ("path", "string", "文件路径"),
+    ("ref", "string", "Branch or tag name"), ("page", "integer", "Page number"),
+    ("per_page", "integer", "Items per page"), ("state", "string", "状态过滤"),
+    ("query", "string", "Search keywords"), ("labels", "array", "标签列表"), ("assignee", "string", "负责人"),
+]
+
+
+def make_service(index: int, rng: random.Random) -> Tuple[str, str, List[Tool]]:
+    """生成一个服务（约三成使用中文描述）"""
+    chinese = rng.random() < 0.3
+    service_name = f"svc{index}"
+    service_description = f"{rng.choice(CHINESE_NOUNS)}服务" if chinese else f"{rng.choice(NOUNS)} service"
+    tools = []
+    names = set()
+    while len(tools) < TOOLS_PER_SERVICE:
+        verb = rng.choice(VERBS)
+        noun = rng.choice(NOUNS)
+        name = f"{verb}_{noun}" if rng.random() < 0.7 else f"{verb}_{noun}_{rng.choice(NOUNS)}"
+        if name in names:
+            continue
+        names.add(name)
+        if chinese:
+            description = f"{rng.choice(CHINESE_VERBS)}{rng.choice(CHINESE_NOUNS)}，{rng.choice(CHINESE_PHRASES)}"
+        else:
+            description = f"{verb.capitalize()} {noun.replace('_', ' ')} {rng.choice(ENGLISH_PHRASES)}"
+        params = rng.sample(PARAM_NAMES, rng.randint(1, 6))
+        tools.append(Tool(
+            name=name,
+            description=description,
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    param: {"type": param_type, "description": param_description}
+                    for param, param_type, param_description in params
+                },
+                "required": [params[0][0]],
+            },
+        ))
+    return service_name, service_description, tools
+
+
+def make_catalog(size: int, seed: int) -> List[Tuple[str, str, List[Tool]]]:
+    """生成指定规模的工具目录"""
+    rng = random.Random(seed)
+    return [make_service(i, rng) for i in range((size + TOOLS_PER_SERVICE - 1) // TOOLS_PER_SERVICE)]
+
+
+def make_queries(catalog: List[Tuple[str, str, List[Tool]]], count: int, seed: int) -> List[str]:
+    """生成查询：完整名称、单个词、中文词、拼写错误、多词自然语言"""
+    rng = random.Random(seed + 1)
+    queries = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            service_name, _, tools = rng.choice(catalog)
+            queries.append(f"{service_name}_{rng.choice(tools).name}")
+        elif kind == 1:
+            queries.append(rng.choice(NOUNS).split("_")[0])
+        elif kind == 2:
+            queries.append(rng.choice(CHINESE_VERBS) + rng.choice(CHINESE_NOUNS))
+        elif kind == 3:
+            name = rng.choice(rng.choice(catalog)[2]).name
+            position = rng.randrange(1, len(name) - 1)
+            queries.append(name[:position] + name[position + 1:])
+        else:
+            queries.append(f"{rng.choice(VERBS)} {rng.choice(NOUNS).replace('_', ' ')} {rng.choice(ENGLISH_PHRASES)}")
+    return queries
+
+
+def new_manager(engine: str) -> ToolIndexManager:
+    """创建索引管理器（关闭查询缓存，测量真实查询耗时）"""
+    return ToolIndexManager(engine=engine, search_cache_size=0)
+
+
+def build(manager: ToolIndexManager, catalog: List[Tuple[str, str, List[Tool]]]) -> None:
+    # 使用服务名作为前缀（与聚合多个服务时一致），避免不同服务的同名工具互相覆盖
+    for service_name, service_description, tools in catalog:
+        manager.add_tools(tools, service_name, service_description, prefix=service_name)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run_case(engine: str, size: int, query_count: int, seed: int, measure_memory: bool) -> Dict[str, Any]:
+    """测量单个引擎在单个规模下的各项指标"""
+    catalog = make_catalog(size, seed)
+    queries = make_queries(catalog, query_count, seed)
+    tool_count = sum(len(tools) for _, _, tools in catalog)
+
+    gc.collect()
+    manager = new_manager(engine)
+    started = time.perf_counter()
+    build(manager, catalog)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    # 首次查询可能触发延迟计算（如 TF-IDF 权重），单独记录
+    started = time.perf_counter()
+    manager.search(queries[0])
+    first_query_ms = (time.perf_counter() - started) * 1000
+
+    latencies = []
+    result_counts = []
+    for query in queries:
+        started = time.perf_counter()
+        results = manager.search(query, limit=20)
+        latencies.append((time.perf_counter() - started) * 1000)
+        result_counts.append(len(results))
+
+    # 新增/移除单个服务（模拟服务重连、启停）
+    extra_name, extra_description, extra_tools = make_service(len(catalog), random.Random(seed + 2))
+    add_times, remove_times = [], []
+    for _ in range(5):
+        started = time.perf_counter()
+        manager.add_tools(extra_tools, extra_name, extra_description, prefix=extra_name)
+        manager.search(queries[0])  # 计入延迟生效的索引更新
+        add_times.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        manager.remove_service_tools(extra_name)
+        manager.search(queries[0])
+        remove_times.append((time.perf_counter() - started) * 1000)
+
+    result = {
+        "engine": engine,
+        "engine_class": type(manager._search_engine).__name__,
+        "tools": manager.get_tool_count(),
+        "services": len(catalog),
+        "queries": len(queries),
+        "build_ms": round(build_ms, 2),
+        "first_query_ms": round(first_query_ms, 3),
+        "query_p50_ms": round(statistics.median(latencies), 3),
+        "query_p99_ms": round(percentile(latencies, 0.99), 3),
+        "query_mean_results": round(statistics.mean(result_counts), 2),
+        "add_service_ms": round(statistics.median(add_times), 3),
+        "remove_service_ms": round(statistics.median(remove_times), 3),
+    }
+    del manager
+
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        manager = new_manager(engine)
+        build(manager, catalog)
+        manager.search(queries[0])
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # 工具定义本身（Tool 对象）由目录持有，不计入
+        result["memory_per_tool_bytes"] = round((current - baseline) / max(tool_count, 1))
+        del manager
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="工具搜索基准测试")
+    parser.add_argument("--sizes", default="100,1000,10000", help="工具数量，逗号分隔（最大 100000）")
+    parser.add_argument("--engines", default="simple,whoosh,bm25,tfidf", help="搜索引擎，逗号分隔")
+    parser.add_argument("--queries", type=int, default=500, help="每个用例的查询次数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-memory", action="store_true", help="不测量内存（tracemalloc 会明显变慢）")
+    parser.add_argument("--output", default="bench_results.json", help="结果 JSON 文件路径")
+    args = parser.parse_args()
+
+    sizes = [min(int(size), 100000) for size in args.sizes.split(",") if size]
+    engines = [engine.strip() for engine in args.engines.split(",") if engine.strip()]
+
+    results = []
+    for size in sizes:
+        for engine in engines:
+            result = run_case(engine, size, args.queries, args.seed, not args.no_memory)
+            results.append(result)
+            print(
+                f"{engine:>7} {result['tools']:>7} 个工具 | 构建 {result['build_ms']:>9.1f} ms | "
+                f"查询 p50 {result['query_p50_ms']:>7.3f} ms p99 {result['query_p99_ms']:>8.3f} ms | "
+                f"增/删服务 {result['add_service_ms']:>7.2f}/{result['remove_service_ms']:>6.2f} ms | "
+                f"内存 {result.get('memory_per_tool_bytes', '-')} B/工具",
+                flush=True
+            )
+
+    output = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "tools_per_service": TOOLS_PER_SERVICE,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 
 import logging
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -284,6 +284,10 @@ async def list_mcp_servers():
             server_info["connection_status"] = status
             server_info["connected"] = status == "connected"
             
+            stats = manager.get_service_stats(server_config.name)
+            if stats:
+                server_info["stats"] = stats
+            
             # 如果有客户端，获取详细状态
             client = manager.clients.get(server_config.name)
             if client:
@@ -464,6 +468,41 @@ async def reconnect_mcp_server(name: str):
     return {"message": "重连成功"}
 
 
+@router.get("/stats")
+async def get_stats():
+    """获取调用统计（结果缓存命中率等）"""
+    config_manager, mcp_server = _get_config_manager()
+    if not mcp_server:
+        return {"services": {}}
+    
+    services = {"local": mcp_server.command_manager.get_service_stats()}
+    for name in mcp_server.mcp_client_manager.clients:
+        services[name] = mcp_server.mcp_client_manager.get_service_stats(name)
+    result = {"services": services}
+    if mcp_server.tool_index_manager:
+        result["index"] = mcp_server.tool_index_manager.get_build_stats()
+        result["search_cache"] = mcp_server.tool_index_manager.get_search_cache_stats()
+        usage = mcp_server.tool_index_manager.get_usage_stats()
+        if usage is not None:
+            result["usage"] = usage
+    return result
+
+
+@router.get("/tools/complete")
+async def complete_tools(prefix: str = "", service: Optional[str] = None, limit: int = 20):
+    """按名称前缀补全工具"""
+    config_manager, mcp_server = _get_config_manager()
+    if not mcp_server or not mcp_server.tool_index_manager:
+        return {"prefix": prefix, "tools": [], "total": 0}
+    
+    results = mcp_server.tool_index_manager.complete(prefix, service or None, max(1, min(limit, 200)))
+    return {
+        "prefix": prefix,
+        "tools": [tool.to_dict("compact") for tool in results],
+        "total": len(results)
+    }
+
+
 # 鉴权配置管理 API
 @router.get("/auth-configs")
 async def list_auth_configs():
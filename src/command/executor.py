@@ -8,6 +8,8 @@ import httpx
 
 from ..config.models import CommandConfig, Config
 from ..auth.manager import AuthManager
+from ..utils.result_cache import make_call_key
+from ..utils.singleflight import SingleFlight
 
 
 class CommandExecutor:
@@ -16,9 +18,17 @@ class CommandExecutor:
     def __init__(self, config: Config, auth_manager: AuthManager):
         self.config = config
         self.auth_manager = auth_manager
+        self.singleflight = SingleFlight()  # 合并参数相同的并发调用
 
     async def execute(self, command: CommandConfig, arguments: Dict[str, Any]) -> Any:
         """执行命令"""
+        if command.coalesce:
+            key = make_call_key("local", command.name, arguments)
+            return await self.singleflight.do(key, lambda: self._execute(command, arguments))
+        return await self._execute(command, arguments)
+
+    async def _execute(self, command: CommandConfig, arguments: Dict[str, Any]) -> Any:
+        """按类型执行命令"""
         if command.type == "http":
             return await self._execute_http(command, arguments)
         elif command.type == "script":
@@ -1,11 +1,25 @@
 """命令管理器"""
 
+import logging
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
 from mcp.types import Tool, TextContent
 
-from ..config.models import CommandConfig, Config
+from ..config.models import CommandConfig, Config, ResultCacheConfig
 from .executor import CommandExecutor
 from ..auth.manager import AuthManager
+from ..utils.result_cache import ResultCache, make_call_key
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ToolRoute:
+    """工具路由项：暴露名称 -> (服务, 原始名称, 类型)"""
+
+    service: str  # 服务名称，本地命令为 "local"
+    original_name: str  # 原始工具名（不带前缀）
+    kind: str  # "local" 或 "mcp"
 
 
 class CommandManager:
@@ -17,13 +31,41 @@ class CommandManager:
         self.executor = CommandExecutor(config, auth_manager)
         self._local_commands: Dict[str, CommandConfig] = {}
         self._mcp_commands: Dict[str, Dict[str, Any]] = {}  # {tool_name: {service, tool}}
+        self._service_commands: Dict[str, List[str]] = {}  # {service_name: [tool_names]}
+        # 路由表：{暴露名称: ToolRoute}，调用分发只需一次字典查找
+        self._routes: Dict[str, ToolRoute] = {}
+        self._result_cache: Optional[ResultCache] = None  # 本地命令结果缓存
         self._build_local_commands()
 
     def _build_local_commands(self) -> None:
-        """构建本地命令索引"""
+        """构建本地命令索引（同时重建路由表）"""
         self._local_commands = {
             cmd.name: cmd for cmd in self.config.commands if cmd.enabled
         }
+        
+        # 重建路由表：本地命令优先于同名的 MCP 工具
+        routes = {
+            name: ToolRoute(service=info["service"], original_name=info["original_name"], kind="mcp")
+            for name, info in self._mcp_commands.items()
+        }
+        for name in self._local_commands:
+            routes[name] = ToolRoute(service="local", original_name=name, kind="local")
+        self._routes = routes
+        
+        # 本地命令共用一个缓存，缓存时间按命令配置
+        cached_commands = [
+            cmd for cmd in self._local_commands.values()
+            if cmd.cache and cmd.cache.enabled
+        ]
+        if cached_commands:
+            self._result_cache = ResultCache(ResultCacheConfig(
+                enabled=True,
+                ttl=0,
+                max_entries=max(cmd.cache.max_entries for cmd in cached_commands),
+                tool_ttl={cmd.name: cmd.cache.ttl for cmd in cached_commands}
+            ))
+        else:
+            self._result_cache = None
 
     def register_mcp_tool(self, service_name: str, tool: Tool, prefix: Optional[str] = None) -> None:
         """注册 MCP 服务工具"""
@@ -33,15 +75,29 @@ class CommandManager:
             "tool": tool,
             "original_name": tool.name
         }
+        
+        service_commands = self._service_commands.setdefault(service_name, [])
+        if tool_name not in service_commands:
+            service_commands.append(tool_name)
+        
+        if tool_name in self._local_commands:
+            logger.warning(f"MCP 工具 {tool_name} (服务: {service_name}) 与本地命令同名，将优先路由到本地命令")
+            return
+        self._routes[tool_name] = ToolRoute(service=service_name, original_name=tool.name, kind="mcp")
 
     def unregister_mcp_tools(self, service_name: str) -> None:
         """注销 MCP 服务工具"""
-        to_remove = [
-            name for name, info in self._mcp_commands.items()
-            if info["service"] == service_name
-        ]
-        for name in to_remove:
-            del self._mcp_commands[name]
+        for name in self._service_commands.pop(service_name, []):
+            info = self._mcp_commands.get(name)
+            if info and info["service"] == service_name:
+                del self._mcp_commands[name]
+                route = self._routes.get(name)
+                if route and route.kind == "mcp" and route.service == service_name:
+                    del self._routes[name]
+
+    def get_route(self, name: str) -> Optional[ToolRoute]:
+        """根据暴露名称获取工具路由"""
+        return self._routes.get(name)
 
     def get_all_tools(self) -> List[Tool]:
         """获取所有工具（本地 + MCP）"""
@@ -99,6 +155,14 @@ class CommandManager:
         """调用工具"""
         # 检查是否是本地命令
         if name in self._local_commands:
+            cache = self._result_cache
+            key = None
+            if cache is not None and cache.is_cacheable(name):
+                key = make_call_key("local", name, arguments)
+                hit, cached = cache.get(key)
+                if hit:
+                    return cached
+            
             command = self._local_commands[name]
             result = await self.executor.execute(command, arguments)
             
@@ -109,7 +173,10 @@ class CommandManager:
             else:
                 text = str(result)
             
-            return [TextContent(type="text", text=text)]
+            contents = [TextContent(type="text", text=text)]
+            if key is not None:
+                cache.set(key, name, contents)
+            return contents
         
         # 检查是否是 MCP 服务工具
         if name in self._mcp_commands:
@@ -118,6 +185,15 @@ class CommandManager:
         
         raise ValueError(f"工具不存在: {name}")
 
+    def get_service_stats(self) -> Dict[str, Any]:
+        """获取本地命令的调用统计"""
+        stats: Dict[str, Any] = {}
+        if self._result_cache is not None:
+            stats["cache"] = self._result_cache.stats()
+        if any(cmd.coalesce for cmd in self._local_commands.values()):
+            stats["coalescing"] = self.executor.singleflight.stats()
+        return stats
+
     def reload(self, config: Config) -> None:
         """重新加载配置"""
         self.config = config
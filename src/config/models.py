@@ -41,6 +41,15 @@ class ParameterConfig(BaseModel):
     default: Optional[Any] = None
 
 
+class ResultCacheConfig(BaseModel):
+    """结果缓存配置（仅适用于只读/幂等工具，默认关闭）"""
+    enabled: bool = False
+    ttl: int = 60  # 默认缓存时间（秒），0 表示不缓存
+    max_entries: int = 256  # LRU 最大条目数
+    tools: Optional[List[str]] = None  # 允许缓存的工具（原始名称），None 表示全部
+    tool_ttl: Dict[str, int] = Field(default_factory=dict)  # 按工具覆盖缓存时间
+
+
 class CommandConfig(BaseModel):
     """命令配置"""
     name: str
@@ -50,6 +59,8 @@ class CommandConfig(BaseModel):
     http: Optional[HttpCommandConfig] = None
     script: Optional[ScriptCommandConfig] = None
     parameters: List[ParameterConfig] = Field(default_factory=list)
+    cache: Optional[ResultCacheConfig] = None  # 结果缓存（可选）
+    coalesce: bool = False  # 合并参数相同的并发调用
 
 
 class ApiKeyAuthConfig(BaseModel):
@@ -113,6 +124,13 @@ class McpServerConfig(BaseModel):
     retry_on_failure: bool = True
     auto_reconnect: bool = True
     env: Optional[Dict[str, str]] = None  # 环境变量
+    cache: Optional[ResultCacheConfig] = None  # 结果缓存（可选）
+    coalesce: bool = False  # 合并参数相同的并发调用
+    coalesce_tools: Optional[List[str]] = None  # 参与合并的工具（原始名称），None 表示全部
+    max_in_flight: int = 0  # 最大并发请求数，0 表示不限制
+    max_queue: int = 100  # 达到并发上限后的最大排队数，超出后快速失败
+    call_timeout: Optional[float] = None  # 工具调用超时（秒），未设置时使用 timeout
+    tool_timeouts: Dict[str, float] = Field(default_factory=dict)  # 按工具覆盖调用超时（原始名称）
 
 
 class ToolProxyConfig(BaseModel):
@@ -120,8 +138,34 @@ class ToolProxyConfig(BaseModel):
     enable_search: bool = True
     enable_execute: bool = True
     enable_list_services: bool = True
+    enable_execute_batch: bool = True  # 启用批量执行工具
+    enable_fetch_result: bool = True  # 启用大结果分块读取工具
+    enable_pipeline: bool = True  # 启用服务端流水线工具
+    enable_describe: bool = True  # 启用工具详情工具（返回完整参数 schema）
     search_limit: int = 20
+    search_detail: str = "compact"  # 搜索结果默认详细程度：compact（名称 + 一行描述）/ params / full
+    describe_max_tools: int = 10  # 单次查询工具详情的最大数量
+    search_engine: str = "whoosh"  # 搜索引擎：whoosh / simple / bm25 / tfidf（whoosh 未安装时回退到 simple）
+    tfidf_lsa_components: int = 0  # tfidf 引擎的 LSA 降维维数（需要 scipy），0 表示不降维
+    fuzzy_search: bool = True  # 三元组模糊匹配与搜索结果融合排序（容忍拼写错误）
+    fuzzy_min_similarity: float = 0.3  # 模糊匹配的最低相似度（Dice 系数，0-1）
+    search_cache_size: int = 256  # 查询结果缓存条目数（工具增删时自动失效），0 表示不缓存
+    usage_ranking: bool = True  # 记录工具调用次数和成功率，常用工具在搜索结果中靠前
+    usage_boost: float = 0.3  # 调用频率加成的权重（相关度按最高分归一化到 0-1）
+    usage_half_life_days: float = 7.0  # 调用统计的衰减半衰期（天）
+    validate_arguments: bool = True  # 执行前按工具的输入 schema 校验参数，校验失败时直接返回结构化错误
+    coerce_arguments: bool = True  # 校验前按 schema 转换常见的类型错误（如 "5" -> 5、JSON 字符串 -> 对象）
     expose_local_commands: bool = False  # 是否暴露本地命令（默认不暴露，通过搜索和执行访问）
+    batch_max_calls: int = 50  # 单次批量执行的最大调用数
+    batch_concurrency_per_service: int = 4  # 批量执行时每个服务的最大并发数
+    max_inline_result_bytes: int = 64 * 1024  # 直接返回的结果大小上限，超出部分暂存在服务端，0 表示不限制
+    fetch_result_lines: int = 200  # 按行读取暂存结果时的默认行数
+    result_store_max_entries: int = 32  # 最多暂存的结果数量（LRU 淘汰）
+    result_store_max_bytes: int = 64 * 1024 * 1024  # 暂存结果的总大小上限
+    result_store_ttl: int = 600  # 暂存结果的过期时间（秒）
+    pipeline_max_steps: int = 20  # 流水线最大步骤数
+    pipeline_max_fanout: int = 100  # 流水线 for_each 单步最大展开数量
+    pipeline_concurrency: int = 8  # 流水线最大并发调用数
 
 
 class GlobalConfig(BaseModel):
@@ -140,6 +184,9 @@ class GlobalConfig(BaseModel):
     hot_reload_interval: int = 2
     tool_proxy_mode: bool = False  # 启用工具代理模式
     tool_proxy: ToolProxyConfig = Field(default_factory=ToolProxyConfig)
+    catalog_cache: bool = True  # 持久化工具目录快照，启动时预加载
+    catalog_cache_file: Optional[str] = None  # 快照文件路径，默认 ~/.mymcp/catalog_cache.json
+    usage_stats_file: Optional[str] = None  # 工具调用统计文件路径，默认与快照文件在同一目录的 usage_stats.json
     
     def get_log_file_path(self) -> Optional[str]:
         """获取日志文件路径（如果未设置则返回默认路径）"""
@@ -150,6 +197,20 @@ class GlobalConfig(BaseModel):
         from pathlib import Path
         default_path = Path.home() / ".mymcp" / "mymcp.log"
         return str(default_path)
+    
+    def get_catalog_cache_path(self) -> str:
+        """获取工具目录快照文件路径"""
+        if self.catalog_cache_file:
+            return os.path.expanduser(self.catalog_cache_file)
+        from pathlib import Path
+        return str(Path.home() / ".mymcp" / "catalog_cache.json")
+    
+    def get_usage_stats_path(self) -> str:
+        """获取工具调用统计文件路径"""
+        if self.usage_stats_file:
+            return os.path.expanduser(self.usage_stats_file)
+        # 与工具目录快照放在同一目录
+        return os.path.join(os.path.dirname(self.get_catalog_cache_path()), "usage_stats.json")
 
 
 class Config(BaseModel):
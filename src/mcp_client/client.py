@@ -1,8 +1,14 @@
 """MCP 客户端实现"""
 
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
-from mcp.types import Tool
+from mcp.types import (
+    CancelledNotification,
+    CancelledNotificationParams,
+    ClientNotification,
+    Tool,
+)
 
 from .connection import McpConnection
 
@@ -17,6 +23,7 @@ class McpClient:
         self.connection = connection
         self.session = None
         self._tools_cache: Optional[List[Tool]] = None
+        self._request_id_warned = False
 
     async def connect(self) -> None:
         """建立连接"""
@@ -183,17 +190,92 @@ class McpClient:
             
             raise
 
-    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
-        """调用工具"""
+    async def call_tool(self, name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """调用工具
+
+        Args:
+            name: 工具名称
+            arguments: 工具参数
+            timeout: 调用超时时间（秒），None 表示不限制。超时后会通知服务取消该请求，
+                并抛出 TimeoutError
+        """
         if not self.session:
             await self.connect()
 
+        if timeout is None:
+            try:
+                return await self.session.call_tool(name, arguments)
+            except Exception as e:
+                logger.error(f"MCP 客户端 {self.name} 调用工具 {name} 失败: {e}", exc_info=True)
+                raise
+
+        # 在当前任务中计时（而不是另起任务），以便准确获取本次请求的 ID
+        session = self.session
+        request_id = self._next_request_id(session)
+        task = asyncio.current_task()
+        timed_out = False
+
+        def on_timeout() -> None:
+            nonlocal timed_out
+            timed_out = True
+            task.cancel()
+
+        handle = asyncio.get_running_loop().call_later(max(timeout, 0), on_timeout)
         try:
-            result = await self.session.call_tool(name, arguments)
-            return result
+            return await session.call_tool(name, arguments)
+        except asyncio.CancelledError:
+            if not timed_out:
+                raise
+            if hasattr(task, "uncancel"):
+                task.uncancel()
         except Exception as e:
             logger.error(f"MCP 客户端 {self.name} 调用工具 {name} 失败: {e}", exc_info=True)
             raise
+        finally:
+            handle.cancel()
+
+        if request_id is None:
+            logger.warning(
+                f"MCP 客户端 {self.name} 调用工具 {name} 超时（{timeout:.2f} 秒），"
+                f"无法获取请求 ID，未能通知服务取消请求"
+            )
+        else:
+            logger.warning(f"MCP 客户端 {self.name} 调用工具 {name} 超时（{timeout:.2f} 秒），已取消请求")
+            await self._send_cancelled(session, request_id, f"调用超时（{timeout:.2f} 秒）")
+        raise TimeoutError(f"调用工具 {name} 超时（{timeout:.2f} 秒）")
+
+    def _next_request_id(self, session: Any) -> Optional[int]:
+        """获取会话下一个请求的 ID（用于超时后发送取消通知）
+
+        MCP SDK 没有公开请求 ID，BaseSession 在 send_request 中按 _request_id 递增分配；
+        属性不存在（SDK 变更）时记录一次警告，超时后无法通知服务取消请求。
+        """
+        request_id = getattr(session, "_request_id", None)
+        if isinstance(request_id, int) and not isinstance(request_id, bool):
+            return request_id
+        if not self._request_id_warned:
+            self._request_id_warned = True
+            logger.warning(
+                f"[{self.name}] 无法从 MCP 会话获取请求 ID（SDK 版本可能不兼容），"
+                f"调用超时后将不会发送 notifications/cancelled"
+            )
+        return None
+
+    async def _send_cancelled(self, session: Any, request_id: Optional[int], reason: str) -> None:
+        """通知服务取消请求（notifications/cancelled）"""
+        if request_id is None or session is None:
+            return
+        try:
+            await session.send_notification(
+                ClientNotification(
+                    CancelledNotification(
+                        method="notifications/cancelled",
+                        params=CancelledNotificationParams(requestId=request_id, reason=reason)
+                    )
+                )
+            )
+        except Exception as e:
+            logger.debug(f"[{self.name}] 发送取消通知失败: {e}")
 
     @property
     def is_connected(self) -> bool:
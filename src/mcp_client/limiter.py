@@ -0,0 +1,93 @@
+"""MCP 服务并发限制（公平排队 + 背压）"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+
+class ServiceOverloadedError(RuntimeError):
+    """服务排队已满，请求被拒绝"""
+
+
+class ConcurrencyLimiter:
+    """按先来先服务顺序限制并发请求数，排队已满时快速失败"""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # 统计
+        self._acquired = 0
+        self._queued = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def acquire(self) -> None:
+        """获取执行名额"""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._acquired += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self._rejected += 1
+            raise ServiceOverloadedError(
+                f"MCP 服务 {self.name} 繁忙：并发 {self._in_flight}/{self.max_in_flight}，"
+                f"排队 {len(self._waiters)}/{self.max_queue}，请稍后重试"
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._queued += 1
+        started = time.monotonic()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已经转交给当前请求，但请求被取消，继续转交
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+        finally:
+            waited = time.monotonic() - started
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        self._acquired += 1
+
+    def release(self) -> None:
+        """释放执行名额（直接转交给下一个排队的请求）"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    async def __aenter__(self) -> "ConcurrencyLimiter":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取并发统计"""
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_length": len(self._waiters),
+            "max_queue": self.max_queue,
+            "acquired": self._acquired,
+            "queued": self._queued,
+            "rejected": self._rejected,
+            "avg_wait_ms": round(self._total_wait / self._queued * 1000, 2) if self._queued else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 2)
+        }
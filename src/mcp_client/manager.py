@@ -2,13 +2,18 @@
 
 import asyncio
 import logging
+import time
 from typing import Dict, Optional, List, Any
 from mcp.types import Tool
 
 from ..config.models import Config, McpServerConfig
 from .client import McpClient
 from .connection import McpConnection
+from .limiter import ConcurrencyLimiter, ServiceOverloadedError
 from ..tool_index.manager import ToolIndexManager
+from ..tool_index.snapshot import CatalogSnapshot
+from ..utils.result_cache import ResultCache, make_call_key
+from ..utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -26,11 +31,25 @@ class McpClientManager:
         self._retry_tasks: Dict[str, asyncio.Task] = {}  # 重试任务
         self._connection_status: Dict[str, str] = {}  # 连接状态: "connecting", "connected", "error", "disconnected"
         self._retry_counts: Dict[str, int] = {}  # 重试次数计数
+        self._server_configs: Dict[str, McpServerConfig] = {}  # 已连接服务的配置
+        self._result_caches: Dict[str, ResultCache] = {}  # 结果缓存（按服务）
+        self._singleflights: Dict[str, SingleFlight] = {}  # 并发调用合并（按服务）
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}  # 并发限制（按服务）
+        self._call_stats: Dict[str, Dict[str, int]] = {}  # 调用统计：调用数、错误数、超时数
+        # 工具目录版本号：服务增删、重载时递增，用于缓存 list_tools 响应
+        self._catalog_generation = 0
+        self.on_catalog_changed = None  # 回调函数，参数为新的版本号
+        # 工具目录快照：启动时预加载，服务上线后校验
+        self._snapshot: Optional[CatalogSnapshot] = None
+        if config.global_config.catalog_cache:
+            self._snapshot = CatalogSnapshot(config.global_config.get_catalog_cache_path())
+        self._stale_services: Dict[str, McpServerConfig] = {}  # 使用快照数据、尚未校验的服务
 
     async def initialize(self) -> None:
         """初始化所有启用的 MCP 服务（异步，不阻塞）"""
         enabled_servers = [s for s in self.config.mcp_servers if s.enabled]
         logger.info(f"开始初始化 {len(enabled_servers)} 个 MCP 服务: {[s.name for s in enabled_servers]}")
+        self._preload_snapshot(enabled_servers)
         
         for server_config in enabled_servers:
             # 异步启动，不阻塞主流程
@@ -38,6 +57,61 @@ class McpClientManager:
             task = asyncio.create_task(self._async_add_server(server_config))
             self._init_tasks[server_config.name] = task
 
+    def _preload_snapshot(self, server_configs: List[McpServerConfig]) -> None:
+        """从快照预加载工具（注册路由和索引），标记为待校验"""
+        if self._snapshot is None:
+            return
+        self._snapshot.retain(s.name for s in self.config.mcp_servers)
+        
+        preloaded = 0
+        for server_config in server_configs:
+            tools = self._snapshot.get_tools(server_config)
+            if not tools:
+                continue
+            for tool in tools:
+                self.command_manager.register_mcp_tool(server_config.name, tool, server_config.prefix)
+            if self.tool_index_manager:
+                self.tool_index_manager.add_tools(
+                    tools=tools,
+                    service_name=server_config.name,
+                    service_description=server_config.description,
+                    prefix=server_config.prefix
+                )
+            self._stale_services[server_config.name] = server_config
+            preloaded += len(tools)
+        
+        if self._stale_services:
+            logger.info(f"已从快照预加载 {len(self._stale_services)} 个服务的 {preloaded} 个工具")
+            self._bump_catalog_generation()
+
+    def _drop_stale_service(self, name: str) -> None:
+        """连接尝试全部失败后，移除从快照预加载的路由和索引（快照本身保留，下次启动仍可预加载）"""
+        if name in self.clients or self._stale_services.pop(name, None) is None:
+            return
+        self.command_manager.unregister_mcp_tools(name)
+        if self.tool_index_manager:
+            self.tool_index_manager.remove_service_tools(name)
+        self._bump_catalog_generation()
+        logger.warning(f"MCP 服务 {name} 连接失败，已移除从快照预加载的工具")
+
+    def is_service_stale(self, name: str) -> bool:
+        """服务的工具是否来自快照、尚未经过实时校验"""
+        return name in self._stale_services
+
+    async def _wait_for_stale_service(self, name: str, deadline: Optional[float]) -> None:
+        """等待使用快照数据的服务完成连接尝试（包括失败后的重试），最多等到调用截止时间"""
+        while name not in self.clients and name in self._stale_services:
+            # 初始化任务失败后会启动重试任务，两者都已结束时不再等待
+            pending = [t for t in (self._init_tasks.get(name), self._retry_tasks.get(name)) if t and not t.done()]
+            if not pending:
+                return
+            task = pending[-1]
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if timeout == 0:
+                raise TimeoutError(f"MCP 服务 {name} 仍在启动中，请稍后重试")
+            logger.debug(f"MCP 服务 {name} 尚未连接，等待连接完成")
+            await asyncio.wait({task}, timeout=timeout)
+
     async def _async_add_server(self, server_config: McpServerConfig) -> None:
         """异步添加 MCP 服务（内部方法）"""
         # 如果已经在重试，不要重复启动
@@ -61,6 +135,7 @@ class McpClientManager:
             else:
                 # 如果未启用重试，直接标记为失败并停止
                 logger.info(f"MCP 服务 {server_config.name} 未启用重试，停止连接尝试")
+                self._drop_stale_service(server_config.name)
 
     async def add_server(self, server_config: McpServerConfig, skip_retry: bool = False) -> None:
         """添加 MCP 服务"""
@@ -69,7 +144,13 @@ class McpClientManager:
             logger.debug(f"MCP 服务 {server_config.name} 已禁用，跳过连接")
             return
         
-        if server_config.name in self.clients:
+        # 使用快照数据、仍在首次连接的服务被重新添加（如修改配置）时，同样先清理旧的路由、索引和连接任务
+        current = asyncio.current_task()
+        own_attempt = current is not None and current in (
+            self._init_tasks.get(server_config.name),
+            self._retry_tasks.get(server_config.name)
+        )
+        if server_config.name in self.clients or (server_config.name in self._stale_services and not own_attempt):
             await self.remove_server(server_config.name)
 
         self._connection_status[server_config.name] = "connecting"
@@ -147,31 +228,44 @@ class McpClientManager:
             if tools is None:
                 raise last_error or Exception("获取工具列表失败")
 
-            # 注册工具到命令管理器
-            tool_names = []
-            for tool in tools:
-                tool_name = f"{server_config.prefix}_{tool.name}" if server_config.prefix else tool.name
-                tool_names.append(tool_name)
-                self.command_manager.register_mcp_tool(server_config.name, tool, server_config.prefix)
-            logger.debug(f"[{server_config.name}] 已注册工具: {tool_names[:5]}{'...' if len(tool_names) > 5 else ''}")
-            
-            # 添加到工具索引（如果启用）
-            if self.tool_index_manager:
-                indexed_count = 0
-                for tool in tools:
-                    self.tool_index_manager.add_tool(
-                        tool=tool,
-                        service_name=server_config.name,
-                        service_description=server_config.description,
-                        prefix=server_config.prefix
-                    )
-                    indexed_count += 1
-                logger.info(f"[{server_config.name}] 已添加 {indexed_count} 个工具到索引")
+            # 快照中的工具列表没有变化时，保留已预加载的路由和索引
+            reuse_snapshot = False
+            stale_config = self._stale_services.pop(server_config.name, None)
+            if stale_config is not None:
+                # 配置（如前缀）和工具列表都与预加载时一致才能复用，否则已注册的路由和索引可能过期
+                reuse_snapshot = (
+                    CatalogSnapshot.fingerprint(stale_config) == CatalogSnapshot.fingerprint(server_config)
+                    and self._snapshot.matches(server_config, tools)
+                )
+                if reuse_snapshot:
+                    logger.info(f"[{server_config.name}] 配置和工具列表与快照一致，跳过重建索引")
+                else:
+                    logger.info(f"[{server_config.name}] 配置或工具列表与快照不一致，重新注册")
+                    self.command_manager.unregister_mcp_tools(server_config.name)
+                    if self.tool_index_manager:
+                        self.tool_index_manager.remove_service_tools(server_config.name)
+            if self._snapshot is not None:
+                self._snapshot.update(server_config, tools)
+
+            if not reuse_snapshot:
+                self._register_tools(server_config, tools)
 
             self.clients[server_config.name] = client
+            self._server_configs[server_config.name] = server_config
+            if server_config.cache and server_config.cache.enabled:
+                self._result_caches[server_config.name] = ResultCache(server_config.cache)
+            if server_config.coalesce:
+                self._singleflights[server_config.name] = SingleFlight()
+            if server_config.max_in_flight > 0:
+                self._limiters[server_config.name] = ConcurrencyLimiter(
+                    server_config.name,
+                    server_config.max_in_flight,
+                    server_config.max_queue
+                )
             self._connection_status[server_config.name] = "connected"
             self._retry_counts[server_config.name] = 0  # 重置重试计数
             logger.info(f"[{server_config.name}] ✓ MCP 服务连接成功，工具数量: {len(tools)}")
+            self._bump_catalog_generation()
 
             # 如果启用自动重连，启动监控任务
             if server_config.auto_reconnect:
@@ -190,12 +284,38 @@ class McpClientManager:
                 self._start_retry_task(server_config)
             raise
 
+    def _register_tools(self, server_config: McpServerConfig, tools: List[Tool]) -> None:
+        """注册服务的工具到命令管理器和工具索引"""
+        tool_names = []
+        for tool in tools:
+            tool_name = f"{server_config.prefix}_{tool.name}" if server_config.prefix else tool.name
+            tool_names.append(tool_name)
+            self.command_manager.register_mcp_tool(server_config.name, tool, server_config.prefix)
+        logger.debug(f"[{server_config.name}] 已注册工具: {tool_names[:5]}{'...' if len(tool_names) > 5 else ''}")
+        
+        # 添加到工具索引（如果启用）
+        if self.tool_index_manager:
+            indexed_count = self.tool_index_manager.add_tools(
+                tools=tools,
+                service_name=server_config.name,
+                service_description=server_config.description,
+                prefix=server_config.prefix
+            )
+            build_ms = self.tool_index_manager.get_build_stats()["last_ms"]
+            logger.info(f"[{server_config.name}] 已添加 {indexed_count} 个工具到索引 (耗时 {build_ms} ms)")
+
     async def remove_server(self, name: str) -> None:
         """移除 MCP 服务"""
         if name in self.clients:
             client = self.clients[name]
             await client.disconnect()
             del self.clients[name]
+        self._server_configs.pop(name, None)
+        self._result_caches.pop(name, None)
+        self._singleflights.pop(name, None)
+        self._limiters.pop(name, None)
+        self._call_stats.pop(name, None)
+        self._stale_services.pop(name, None)
 
         # 停止初始化任务
         if name in self._init_tasks:
@@ -222,15 +342,157 @@ class McpClientManager:
             self.tool_index_manager.remove_service_tools(name)
         
         self._connection_status[name] = "disconnected"
+        self._bump_catalog_generation()
         logger.info(f"MCP 服务 {name} 已移除")
 
-    async def call_tool(self, service_name: str, tool_name: str, arguments: Dict) -> Any:
-        """调用 MCP 服务工具"""
+    async def call_tool(
+        self,
+        service_name: str,
+        tool_name: str,
+        arguments: Dict,
+        deadline: Optional[float] = None
+    ) -> Any:
+        """调用 MCP 服务工具
+
+        Args:
+            service_name: 服务名称
+            tool_name: 原始工具名
+            arguments: 工具参数
+            deadline: 调用方截止时间（time.monotonic() 时间戳），与配置的超时取较小值
+        """
+        if service_name not in self.clients and service_name in self._stale_services:
+            # 工具来自快照，服务仍在启动中：等待连接完成（超过截止时间时提示仍在启动中）
+            await self._wait_for_stale_service(service_name, deadline)
         if service_name not in self.clients:
             raise ValueError(f"MCP 服务 {service_name} 未连接")
 
         client = self.clients[service_name]
-        return await client.call_tool(tool_name, arguments)
+        cache = self._result_caches.get(service_name)
+        if cache is not None and not cache.is_cacheable(tool_name):
+            cache = None
+        singleflight = self._singleflights.get(service_name)
+        if singleflight is not None:
+            coalesce_tools = self._server_configs[service_name].coalesce_tools
+            if coalesce_tools is not None and tool_name not in coalesce_tools:
+                singleflight = None
+        if cache is None and singleflight is None:
+            return await self._invoke(service_name, client, tool_name, arguments, deadline)
+        
+        key = make_call_key(service_name, tool_name, arguments)
+        # 只读工具：先查缓存
+        if cache is not None:
+            hit, cached = cache.get(key)
+            if hit:
+                logger.debug(f"[{service_name}] 工具 {tool_name} 命中结果缓存")
+                return cached
+        
+        # 相同参数的并发调用只向上游发送一次
+        if singleflight is not None:
+            shared, leader = singleflight.join(
+                key, lambda: self._invoke(service_name, client, tool_name, arguments, deadline)
+            )
+            if deadline is None:
+                result = await asyncio.shield(shared)
+            else:
+                # 共享调用由发起方的超时控制，这里只限制当前调用方的等待时间（不取消共享任务）
+                done, _ = await asyncio.wait({shared}, timeout=max(deadline - time.monotonic(), 0))
+                if not done:
+                    if not leader:
+                        # 发起方的超时在 _invoke 中统计，这里统计合并等待方
+                        stats = self._call_stats.setdefault(service_name, {"calls": 0, "errors": 0, "timeouts": 0})
+                        stats["timeouts"] += 1
+                    raise TimeoutError(f"调用工具 {tool_name} 超过截止时间")
+                result = shared.result()
+        else:
+            result = await self._invoke(service_name, client, tool_name, arguments, deadline)
+        
+        # 错误结果不缓存
+        if cache is not None and not getattr(result, "isError", False):
+            cache.set(key, tool_name, result)
+        return result
+
+    async def _invoke(
+        self,
+        service_name: str,
+        client: McpClient,
+        tool_name: str,
+        arguments: Dict,
+        deadline: Optional[float] = None
+    ) -> Any:
+        """向上游服务发送调用（受并发限制和超时控制）"""
+        stats = self._call_stats.setdefault(service_name, {"calls": 0, "errors": 0, "timeouts": 0})
+        stats["calls"] += 1
+        try:
+            timeout = self._resolve_call_timeout(service_name, tool_name, deadline)
+            limiter = self._limiters.get(service_name)
+            if limiter is None:
+                result = await client.call_tool(tool_name, arguments, timeout=timeout)
+            else:
+                # 排队等待的时间同样计入超时
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(limiter.acquire(), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"等待 MCP 服务 {service_name} 空闲超时（{timeout:.2f} 秒）")
+                try:
+                    if timeout is not None:
+                        timeout = max(timeout - (time.monotonic() - started), 0)
+                    result = await client.call_tool(tool_name, arguments, timeout=timeout)
+                finally:
+                    limiter.release()
+        except TimeoutError:
+            stats["timeouts"] += 1
+            raise
+        except ServiceOverloadedError:
+            raise
+        except Exception:
+            stats["errors"] += 1
+            raise
+        
+        if getattr(result, "isError", False):
+            stats["errors"] += 1
+        return result
+
+    def _resolve_call_timeout(
+        self,
+        service_name: str,
+        tool_name: str,
+        deadline: Optional[float] = None
+    ) -> Optional[float]:
+        """计算调用超时：工具 > 服务 call_timeout > 服务 timeout > 全局 default_timeout，再受截止时间约束"""
+        timeout: Optional[float] = None
+        server_config = self._server_configs.get(service_name)
+        if server_config:
+            timeout = (
+                server_config.tool_timeouts.get(tool_name)
+                or server_config.call_timeout
+                or server_config.timeout
+            )
+        if not timeout:
+            timeout = self.config.global_config.default_timeout or None
+        
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"调用工具 {tool_name} 已超过截止时间")
+            timeout = min(timeout, remaining) if timeout else remaining
+        return timeout
+
+    def get_service_stats(self, name: str) -> Dict[str, Any]:
+        """获取服务的调用统计"""
+        stats: Dict[str, Any] = {}
+        if name in self._call_stats:
+            stats["calls"] = dict(self._call_stats[name])
+        cache = self._result_caches.get(name)
+        if cache is not None:
+            stats["cache"] = cache.stats()
+        singleflight = self._singleflights.get(name)
+        if singleflight is not None:
+            stats["coalescing"] = singleflight.stats()
+        limiter = self._limiters.get(name)
+        if limiter is not None:
+            stats["concurrency"] = limiter.stats()
+        return stats
 
     async def reload(self, old_config: Config, new_config: Config) -> None:
         """重新加载配置（热更新）"""
@@ -242,7 +504,7 @@ class McpClientManager:
             if name not in old_servers or server_config != old_servers[name]:
                 if server_config.enabled:
                     await self.add_server(server_config)
-                elif name in self.clients:
+                elif name in self.clients or name in self._stale_services:
                     await self.remove_server(name)
 
         # 找出需要移除的服务
@@ -252,6 +514,23 @@ class McpClientManager:
 
         # 更新配置
         self.config = new_config
+        # 本地命令等配置也可能变化，始终递增版本号
+        self._bump_catalog_generation()
+
+    @property
+    def catalog_generation(self) -> int:
+        """当前工具目录版本号"""
+        return self._catalog_generation
+
+    def _bump_catalog_generation(self) -> None:
+        """递增工具目录版本号并通知监听者"""
+        self._catalog_generation += 1
+        logger.debug(f"工具目录版本号更新为 {self._catalog_generation}")
+        if self.on_catalog_changed:
+            try:
+                self.on_catalog_changed(self._catalog_generation)
+            except Exception as e:
+                logger.warning(f"工具目录变更回调执行失败: {e}")
 
     def _start_reconnect_monitor(self, name: str, server_config: McpServerConfig) -> None:
         """启动重连监控"""
@@ -266,8 +545,9 @@ class McpClientManager:
                             await client.connect()
                             # 重新获取工具列表
                             tools = await client.list_tools()
+                            # 先注销旧工具，避免路由表中残留已下线的工具
+                            self.command_manager.unregister_mcp_tools(name)
                             for tool in tools:
-                                tool_name = f"{server_config.prefix}_{tool.name}" if server_config.prefix else tool.name
                                 self.command_manager.register_mcp_tool(name, tool, server_config.prefix)
                             
                             # 更新工具索引
@@ -275,14 +555,16 @@ class McpClientManager:
                                 # 先移除旧索引
                                 self.tool_index_manager.remove_service_tools(name)
                                 # 重新添加
-                                for tool in tools:
-                                    self.tool_index_manager.add_tool(
-                                        tool=tool,
-                                        service_name=name,
-                                        service_description=server_config.description,
-                                        prefix=server_config.prefix
-                                    )
+                                self.tool_index_manager.add_tools(
+                                    tools=tools,
+                                    service_name=name,
+                                    service_description=server_config.description,
+                                    prefix=server_config.prefix
+                                )
+                            if self._snapshot is not None:
+                                self._snapshot.update(server_config, tools)
                             
+                            self._bump_catalog_generation()
                             logger.info(f"MCP 服务 {name} 重连成功")
                         except Exception as e:
                             logger.error(f"MCP 服务 {name} 重连失败: {e}")
@@ -375,6 +657,8 @@ class McpClientManager:
         def cleanup_task(t):
             if name in self._retry_tasks and self._retry_tasks[name] == t:
                 del self._retry_tasks[name]
+            # 重试结束仍未连接：不再保留快照预加载的工具
+            self._drop_stale_service(name)
         
         task.add_done_callback(cleanup_task)
 
@@ -402,4 +686,8 @@ class McpClientManager:
         # 关闭所有连接
         for name in list(self.clients.keys()):
             await self.remove_server(name)
+        
+        # 写入尚未保存的工具目录快照
+        if self._snapshot is not None:
+            self._snapshot.flush()
 
@@ -5,7 +5,7 @@ import logging
 import sys
 from typing import Any, Optional
 
-from mcp.server import Server
+from mcp.server import NotificationOptions, Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
@@ -15,12 +15,19 @@ from .command.manager import CommandManager
 from .auth.manager import AuthManager
 from .mcp_client.manager import McpClientManager
 from .tool_index.manager import ToolIndexManager
+from .tool_index.usage import UsageStats
+from .tool_index.validator import JSONSCHEMA_AVAILABLE
 from .tool_proxy.tools import (
     create_proxy_tools,
     handle_search_tools,
+    handle_describe_tool,
     handle_execute_tool,
+    handle_execute_batch,
+    handle_execute_pipeline,
+    handle_fetch_result,
     handle_list_services
 )
+from .tool_proxy.result_store import ResultStore
 from .utils.logging_config import setup_logging
 
 logger = logging.getLogger(__name__)
@@ -44,12 +51,32 @@ class McpServer:
         # 初始化工具索引管理器（如果启用代理模式）
         self.tool_index_manager = None
         if self.config.global_config.tool_proxy_mode:
-            use_whoosh = True  # 可以添加配置选项
+            proxy_config = self.config.global_config.tool_proxy
+            usage_stats = None
+            if proxy_config.usage_ranking:
+                usage_stats = UsageStats(
+                    self.config.global_config.get_usage_stats_path(),
+                    half_life_days=proxy_config.usage_half_life_days
+                )
+            index_options = dict(
+                fuzzy=proxy_config.fuzzy_search,
+                fuzzy_min_similarity=proxy_config.fuzzy_min_similarity,
+                search_cache_size=proxy_config.search_cache_size,
+                lsa_components=proxy_config.tfidf_lsa_components,
+                usage_stats=usage_stats,
+                usage_boost=proxy_config.usage_boost
+            )
             try:
-                self.tool_index_manager = ToolIndexManager(use_whoosh=use_whoosh)
+                self.tool_index_manager = ToolIndexManager(engine=proxy_config.search_engine, **index_options)
             except ImportError:
-                logger.warning("Whoosh 未安装，使用简单搜索引擎")
-                self.tool_index_manager = ToolIndexManager(use_whoosh=False)
+                # 只更换搜索引擎，保留其余索引配置
+                logger.warning(f"搜索引擎 {proxy_config.search_engine} 依赖未安装，使用简单搜索引擎")
+                self.tool_index_manager = ToolIndexManager(engine="simple", **index_options)
+            if proxy_config.validate_arguments and not JSONSCHEMA_AVAILABLE:
+                logger.warning("jsonschema 未安装，参数校验只检查必需参数（pip install 'jsonschema>=4'）")
+        
+        # 大结果暂存（代理模式下分块返回）
+        self.result_store = ResultStore(self.config.global_config.tool_proxy)
         
         self.mcp_client_manager = McpClientManager(
             self.config,
@@ -59,19 +86,28 @@ class McpServer:
         
         # 如果启用工具代理模式，将本地命令也添加到索引中
         if self.tool_index_manager:
-            for cmd in self.config.commands:
-                if cmd.enabled:
-                    tool = self.command_manager._command_to_tool(cmd)
-                    self.tool_index_manager.add_tool(
-                        tool=tool,
-                        service_name="local",
-                        service_description="本地命令",
-                        prefix=None
-                    )
+            self.tool_index_manager.add_tools(
+                tools=[
+                    self.command_manager._command_to_tool(cmd)
+                    for cmd in self.config.commands
+                    if cmd.enabled
+                ],
+                service_name="local",
+                service_description="本地命令",
+                prefix=None
+            )
         
         # 设置配置变更回调
         self.config_manager.on_config_changed = self._on_config_changed
         
+        # list_tools 响应缓存（按工具目录版本号失效）
+        self._tools_cache: Optional[list[Tool]] = None
+        self._tools_cache_generation = -1
+        # 当前客户端会话（用于发送 tools/list_changed 通知）
+        self._session = None
+        self._notify_task: Optional[asyncio.Task] = None
+        self.mcp_client_manager.on_catalog_changed = self._on_catalog_changed
+        
         # 创建 MCP 服务器
         self.server = Server("mymcp")
         self._setup_handlers()
@@ -85,33 +121,22 @@ class McpServer:
         @self.server.list_tools()
         async def list_tools() -> list[Tool]:
             """列出所有可用工具"""
-            # 如果启用代理模式，只返回代理工具
-            if self.config.global_config.tool_proxy_mode and self.tool_index_manager:
-                proxy_tools = create_proxy_tools(
-                    self.tool_index_manager,
-                    self.mcp_client_manager,
-                    self.config
-                )
-                # 根据配置决定是否暴露本地命令
-                if self.config.global_config.tool_proxy.expose_local_commands:
-                    local_tools = []
-                    for cmd in self.config.commands:
-                        if cmd.enabled:
-                            local_tools.append(self.command_manager._command_to_tool(cmd))
-                    return local_tools + proxy_tools
-                else:
-                    # 代理模式下不直接暴露本地命令，需要通过搜索和执行工具访问
-                    return proxy_tools
-            else:
-                # 传统模式：返回所有工具
-                return self.command_manager.get_all_tools()
+            self._capture_session()
+            generation = self.mcp_client_manager.catalog_generation
+            if self._tools_cache is None or self._tools_cache_generation != generation:
+                self._tools_cache = self._build_tools()
+                self._tools_cache_generation = generation
+                logger.debug(f"已重建工具列表缓存 (版本号: {generation}, 工具数量: {len(self._tools_cache)})")
+            return self._tools_cache
 
         @self.server.call_tool()
         async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             """调用工具"""
+            self._capture_session()
             try:
-                # 检查是否是本地命令
-                if name in [cmd.name for cmd in self.config.commands]:
+                # 通过路由表查找工具（本地命令 / MCP 服务工具）
+                route = self.command_manager.get_route(name)
+                if route and route.kind == "local":
                     return await self.command_manager.call_tool(name, arguments)
                 
                 # 如果启用代理模式，检查是否是代理工具
@@ -124,10 +149,22 @@ class McpServer:
                             self.tool_index_manager,
                             query,
                             service_name,
-                            limit
+                            limit,
+                            detail=arguments.get("detail", self.config.global_config.tool_proxy.search_detail),
+                            mode=arguments.get("mode", "text")
                         )
                         import json
-                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+                        # 搜索结果使用紧凑 JSON，减少返回给模型的内容
+                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, separators=(",", ":")))]
+                    
+                    elif name == "mcp_describe_tool":
+                        result = await handle_describe_tool(
+                            self.tool_index_manager,
+                            arguments.get("tool_names", []),
+                            max_tools=self.config.global_config.tool_proxy.describe_max_tools
+                        )
+                        import json
+                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, separators=(",", ":")))]
                     
                     elif name == "mcp_execute_tool":
                         tool_name = arguments.get("tool_name")
@@ -138,7 +175,45 @@ class McpServer:
                             self.config,
                             tool_name,
                             tool_arguments,
-                            command_manager=self.command_manager
+                            command_manager=self.command_manager,
+                            timeout=arguments.get("timeout"),
+                            result_store=self.result_store
+                        )
+                        import json
+                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+                    
+                    elif name == "mcp_execute_batch":
+                        result = await handle_execute_batch(
+                            self.tool_index_manager,
+                            self.mcp_client_manager,
+                            self.config,
+                            arguments.get("calls", []),
+                            command_manager=self.command_manager,
+                            result_store=self.result_store
+                        )
+                        import json
+                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+                    
+                    elif name == "mcp_execute_pipeline":
+                        result = await handle_execute_pipeline(
+                            self.tool_index_manager,
+                            self.mcp_client_manager,
+                            self.config,
+                            arguments.get("steps", []),
+                            output=arguments.get("output"),
+                            command_manager=self.command_manager,
+                            result_store=self.result_store
+                        )
+                        import json
+                        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+                    
+                    elif name == "mcp_fetch_result":
+                        result = await handle_fetch_result(
+                            self.result_store,
+                            arguments.get("result_handle"),
+                            arguments.get("offset", 0),
+                            arguments.get("length"),
+                            arguments.get("unit", "bytes")
                         )
                         import json
                         return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
@@ -146,37 +221,25 @@ class McpServer:
                     elif name == "mcp_list_services":
                         result = await handle_list_services(
                             self.tool_index_manager,
-                            self.mcp_client_manager
+                            self.mcp_client_manager,
+                            command_manager=self.command_manager
                         )
                         import json
                         return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
                 
                 # 传统模式：检查是否是 MCP 服务工具
-                if not self.config.global_config.tool_proxy_mode:
-                    # 查找工具对应的服务
-                    for service_name, client in self.mcp_client_manager.clients.items():
-                        tools = await client.list_tools()
-                        for tool in tools:
-                            tool_name = tool.name
-                            # 检查是否有前缀
-                            for server_config in self.config.mcp_servers:
-                                if server_config.name == service_name:
-                                    if server_config.prefix:
-                                        tool_name = f"{server_config.prefix}_{tool.name}"
-                                    break
-                            
-                            if tool_name == name:
-                                result = await self.mcp_client_manager.call_tool(
-                                    service_name, tool.name, arguments
-                                )
-                                # 转换结果格式
-                                contents = []
-                                for content in result.content:
-                                    if content.type == "text":
-                                        contents.append(TextContent(type="text", text=content.text))
-                                    else:
-                                        contents.append(TextContent(type="text", text=str(content)))
-                                return contents
+                if not self.config.global_config.tool_proxy_mode and route and route.kind == "mcp":
+                    result = await self.mcp_client_manager.call_tool(
+                        route.service, route.original_name, arguments
+                    )
+                    # 转换结果格式
+                    contents = []
+                    for content in result.content:
+                        if content.type == "text":
+                            contents.append(TextContent(type="text", text=content.text))
+                        else:
+                            contents.append(TextContent(type="text", text=str(content)))
+                    return contents
                 
                 raise ValueError(f"工具不存在: {name}")
             
@@ -184,12 +247,66 @@ class McpServer:
                 logger.error(f"调用工具 {name} 失败: {e}", exc_info=True)
                 raise
 
+    def _build_tools(self) -> list[Tool]:
+        """构建暴露给客户端的工具列表"""
+        # 如果启用代理模式，只返回代理工具
+        if self.config.global_config.tool_proxy_mode and self.tool_index_manager:
+            proxy_tools = create_proxy_tools(
+                self.tool_index_manager,
+                self.mcp_client_manager,
+                self.config
+            )
+            # 根据配置决定是否暴露本地命令
+            if self.config.global_config.tool_proxy.expose_local_commands:
+                local_tools = []
+                for cmd in self.config.commands:
+                    if cmd.enabled:
+                        local_tools.append(self.command_manager._command_to_tool(cmd))
+                return local_tools + proxy_tools
+            else:
+                # 代理模式下不直接暴露本地命令，需要通过搜索和执行工具访问
+                return proxy_tools
+        else:
+            # 传统模式：返回所有工具
+            return self.command_manager.get_all_tools()
+
+    def _capture_session(self) -> None:
+        """记录当前请求所属的客户端会话"""
+        try:
+            self._session = self.server.request_context.session
+        except LookupError:
+            pass
+
+    def _on_catalog_changed(self, generation: int) -> None:
+        """工具目录变更回调：通知客户端重新获取工具列表"""
+        if self._session is None:
+            return
+        # 多个服务同时完成连接时合并为一次通知
+        if self._notify_task and not self._notify_task.done():
+            return
+        try:
+            self._notify_task = asyncio.get_running_loop().create_task(self._send_tools_list_changed())
+        except RuntimeError:
+            logger.debug("没有运行中的事件循环，跳过 tools/list_changed 通知")
+
+    async def _send_tools_list_changed(self) -> None:
+        """发送 notifications/tools/list_changed"""
+        await asyncio.sleep(0)
+        if self._tools_cache_generation == self.mcp_client_manager.catalog_generation:
+            return
+        try:
+            await self._session.send_tool_list_changed()
+            logger.debug(f"已发送 tools/list_changed 通知 (版本号: {self.mcp_client_manager.catalog_generation})")
+        except Exception as e:
+            logger.debug(f"发送 tools/list_changed 通知失败: {e}")
+
     async def _on_config_changed(self, old_config: Config, new_config: Config) -> None:
         """配置变更回调"""
         logger.info("检测到配置变更，开始热重载...")
         
         # 更新配置
         self.config = new_config
+        self.result_store.config = new_config.global_config.tool_proxy
         
         # 重新加载管理器
         self.auth_manager.reload(new_config)
@@ -215,12 +332,16 @@ class McpServer:
                 await self.server.run(
                     read_stream,
                     write_stream,
-                    self.server.create_initialization_options()
+                    self.server.create_initialization_options(
+                        NotificationOptions(tools_changed=True)
+                    )
                 )
         finally:
             # 清理资源
             self.config_manager.stop_watching()
             await self.mcp_client_manager.shutdown()
+            if self.tool_index_manager:
+                self.tool_index_manager.flush_usage()
 
     @classmethod
     async def main(cls, config_path: str) -> None:
@@ -1,7 +1,7 @@
 """工具索引模块"""
 
 from .models import ToolIndex
-from .manager import ToolIndexManager
+from .manager import AmbiguousToolError, ToolIndexManager
 
-__all__ = ["ToolIndex", "ToolIndexManager"]
+__all__ = ["AmbiguousToolError", "ToolIndex", "ToolIndexManager"]
 
@@ -0,0 +1,83 @@
+"""搜索分词（支持中日韩文字，无需额外依赖）
+
+英文等按词切分（拆分驼峰、下划线和标点，统一小写）；
+中日韩文字按单字 + 相邻双字切分，例如 "本地命令" -> 本、本地、地、地命、命、命令、令。
+"""
+
+import re
+from typing import Iterator, List, Tuple
+
+try:
+    from whoosh.analysis import Token, Tokenizer
+    WHOOSH_AVAILABLE = True
+except ImportError:
+    WHOOSH_AVAILABLE = False
+
+# 中日韩文字范围：平假名/片假名、CJK 扩展 A、CJK 统一汉字、兼容汉字、谚文音节
+_CJK_RANGES = "぀-ヿ㐀-䶿一-鿿豈-﫿가-힯"
+_TOKEN_PATTERN = re.compile(f"([{_CJK_RANGES}]+)|([^\\W_{_CJK_RANGES}]+)")
+_CAMEL_CASE_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def iter_tokens(text: str) -> Iterator[Tuple[str, int, int]]:
+    """切分文本，返回 (词, 起始位置, 结束位置)"""
+    if not text:
+        return
+    for match in _TOKEN_PATTERN.finditer(text):
+        cjk, word = match.groups()
+        start = match.start()
+        if cjk:
+            for i in range(len(cjk)):
+                yield cjk[i], start + i, start + i + 1
+                if i + 1 < len(cjk):
+                    yield cjk[i:i + 2], start + i, start + i + 2
+        else:
+            for part in _CAMEL_CASE_BOUNDARY.split(word):
+                yield part.lower(), start, start + len(part)
+                start += len(part)
+
+
+def tokenize(text: str) -> List[str]:
+    """切分文本为词列表"""
+    return [token for token, _, _ in iter_tokens(text)]
+
+
+def contains_cjk(text: str) -> bool:
+    """文本是否包含中日韩文字"""
+    return re.search(f"[{_CJK_RANGES}]", text or "") is not None
+
+
+if WHOOSH_AVAILABLE:
+    class CjkTokenizer(Tokenizer):
+        """Whoosh 分词器（与 tokenize 使用相同的切分规则）"""
+
+        def __call__(
+            self,
+            value,
+            positions=False,
+            chars=False,
+            keeporiginal=False,
+            removestops=True,
+            start_pos=0,
+            start_char=0,
+            tokenize=True,
+            mode="",
+            **kwargs
+        ):
+            token = Token(positions, chars, removestops=removestops, mode=mode, **kwargs)
+            for pos, (text, start, end) in enumerate(iter_tokens(value)):
+                token.text = text
+                token.boost = 1.0
+                token.stopped = False
+                if keeporiginal:
+                    token.original = text
+                if positions:
+                    token.pos = start_pos + pos
+                if chars:
+                    token.startchar = start_char + start
+                    token.endchar = start_char + end
+                yield token
+
+    def cjk_analyzer() -> "CjkTokenizer":
+        """创建 Whoosh 分析器"""
+        return CjkTokenizer()
@@ -1,73 +1,200 @@
 """工具索引管理器"""
 
+import bisect
 import logging
-from typing import Dict, List, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from mcp.types import Tool
 
 from .models import ToolIndex
-from .search_engine import create_search_engine, SimpleSearchEngine
+from .search_engine import TrigramIndex, create_search_engine
+from .usage import UsageStats
 
 logger = logging.getLogger(__name__)
 
 
+class AmbiguousToolError(LookupError):
+    """原始工具名称对应多个工具（需要使用带前缀的完整名称）"""
+
+    def __init__(self, tool_name: str, candidates: List[str]):
+        self.tool_name = tool_name
+        self.candidates = candidates
+        super().__init__(f"工具名称 {tool_name} 对应多个工具，请使用完整名称: {', '.join(candidates)}")
+
+
 class ToolIndexManager:
     """工具索引管理器"""
     
-    def __init__(self, use_whoosh: bool = True):
+    # 启用调用频率加成时，从搜索引擎多取的候选倍数（重新排序后截取）
+    USAGE_OVERFETCH = 3
+    # 三元组相似度在融合排序中的权重（相关度按最高分归一化到 0-1）
+    FUZZY_WEIGHT = 0.5
+    
+    def __init__(
+        self,
+        use_whoosh: bool = True,
+        engine: Optional[str] = None,
+        fuzzy: bool = True,
+        fuzzy_min_similarity: float = 0.3,
+        search_cache_size: int = 256,
+        lsa_components: int = 0,
+        usage_stats: Optional[UsageStats] = None,
+        usage_boost: float = 0.3
+    ):
         # 索引存储：{display_name: ToolIndex}
         self._index: Dict[str, ToolIndex] = {}
         # 服务工具映射：{service_name: [display_names]}
         self._service_tools: Dict[str, List[str]] = {}
-        # 搜索引擎
-        self._search_engine = create_search_engine(use_whoosh=use_whoosh)
+        # 原始名称索引：{name: [display_names]}
+        self._name_index: Dict[str, List[str]] = {}
+        # 搜索引擎（engine 可选 whoosh / simple / bm25 / tfidf）
+        self._search_engine = create_search_engine(
+            use_whoosh=use_whoosh,
+            engine=engine,
+            lsa_components=lsa_components
+        )
+        # 三元组模糊索引（容错匹配，与主搜索结果融合排序）
+        self._trigram_index: Optional[TrigramIndex] = TrigramIndex(fuzzy_min_similarity) if fuzzy else None
+        # 索引版本号：增删工具时递增，查询缓存按版本号失效
+        self._generation = 0
+        # 前缀索引：按小写名称排序的 [(名称, display_name)]，包含显示名称和原始名称；
+        # 版本号变化后在下次前缀查询时重建
+        self._prefix_keys: List[Tuple[str, str]] = []
+        self._prefix_generation = -1
+        # 查询结果缓存：{(规范化查询, 服务, 数量): ((索引版本号, 调用统计版本号), 结果, 各服务命中数量)}，按最近使用排序
+        self._search_cache: "OrderedDict[Tuple[str, Optional[str], int], Tuple[Tuple[int, int], List[ToolIndex], Dict[str, int]]]" = OrderedDict()
+        self._search_cache_size = search_cache_size
+        # 调用统计：按最高分归一化后的相关度加上 usage_boost * 调用频率加成
+        self._usage_stats = usage_stats
+        self._usage_boost = usage_boost
+        self._search_cache_hits = 0
+        self._search_cache_misses = 0
+        # 索引构建统计
+        self._build_stats: Dict[str, Any] = {
+            "builds": 0,
+            "tools": 0,
+            "total_ms": 0.0,
+            "last_service": None,
+            "last_tools": 0,
+            "last_ms": 0.0
+        }
     
-    def add_tool(
+    def _build_tool_index(
         self,
         tool: Tool,
         service_name: str,
         service_description: str,
-        prefix: Optional[str] = None
-    ) -> None:
-        """添加工具到索引"""
+        prefix: Optional[str]
+    ) -> ToolIndex:
+        """根据工具定义构建索引项（参数信息从共享 schema 中获取）"""
         display_name = f"{prefix}_{tool.name}" if prefix else tool.name
-        
-        # 提取参数信息
-        parameters = {}
-        input_schema = tool.inputSchema or {}
-        if isinstance(input_schema, dict):
-            properties = input_schema.get("properties", {})
-            required = input_schema.get("required", [])
-            
-            for param_name, param_schema in properties.items():
-                parameters[param_name] = {
-                    "type": param_schema.get("type", "string"),
-                    "description": param_schema.get("description", ""),
-                    "required": param_name in required
-                }
-        
-        tool_index = ToolIndex(
+        return ToolIndex(
             name=tool.name,
             display_name=display_name,
             description=tool.description or "",
             service_name=service_name,
             service_description=service_description,
-            parameters=parameters,
-            input_schema=input_schema
+            input_schema=tool.inputSchema or {}
         )
-        
+    
+    def _store_tool_index(self, tool_index: ToolIndex) -> bool:
+        """保存索引项（不写入搜索引擎），返回是否替换了同名工具"""
+        display_name = tool_index.display_name
+        service_name = tool_index.service_name
+        self._generation += 1
+        previous = self._index.get(display_name)
+        if previous is not None and previous.name != tool_index.name:
+            self._remove_name_entry(previous.name, display_name)
         self._index[display_name] = tool_index
         
+        # 更新原始名称索引
+        display_names = self._name_index.setdefault(tool_index.name, [])
+        if display_name not in display_names:
+            display_names.append(display_name)
+        
         # 更新服务工具映射
         if service_name not in self._service_tools:
             self._service_tools[service_name] = []
         if display_name not in self._service_tools[service_name]:
             self._service_tools[service_name].append(display_name)
         
-        # 添加到搜索引擎
+        if self._trigram_index is not None:
+            # 只索引原始名称：不同服务的同名工具共享同一个标识符
+            self._trigram_index.add(display_name, [tool_index.name], list(tool_index.parameters))
+        return previous is not None
+    
+    def add_tool(
+        self,
+        tool: Tool,
+        service_name: str,
+        service_description: str,
+        prefix: Optional[str] = None
+    ) -> None:
+        """添加工具到索引"""
+        tool_index = self._build_tool_index(tool, service_name, service_description, prefix)
+        self._store_tool_index(tool_index)
         self._search_engine.add_tool(tool_index)
         self._search_engine.commit()
         
-        logger.debug(f"已添加工具到索引: {display_name} (服务: {service_name})")
+        logger.debug(f"已添加工具到索引: {tool_index.display_name} (服务: {service_name})")
+    
+    def add_tools(
+        self,
+        tools: List[Tool],
+        service_name: str,
+        service_description: str,
+        prefix: Optional[str] = None
+    ) -> int:
+        """批量添加服务的工具到索引（替换该服务已有的工具，只提交一次），返回添加数量"""
+        started = time.perf_counter()
+        if service_name in self._service_tools:
+            # 重新添加服务：先整体移除（搜索引擎按服务删除一次），再批量追加
+            self.remove_service_tools(service_name)
+        
+        fresh: Dict[str, ToolIndex] = {}
+        for tool in tools:
+            tool_index = self._build_tool_index(tool, service_name, service_description, prefix)
+            if self._store_tool_index(tool_index) and tool_index.display_name not in fresh:
+                # 与其他服务的工具重名：逐个替换
+                self._search_engine.add_tool(tool_index)
+            else:
+                fresh[tool_index.display_name] = tool_index
+        self._search_engine.add_tools(list(fresh.values()))
+        self._search_engine.commit()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        stats = self._build_stats
+        stats["builds"] += 1
+        stats["tools"] += len(tools)
+        stats["total_ms"] = round(stats["total_ms"] + elapsed_ms, 2)
+        stats["last_service"] = service_name
+        stats["last_tools"] = len(tools)
+        stats["last_ms"] = round(elapsed_ms, 2)
+        
+        logger.debug(f"已批量添加 {len(tools)} 个工具到索引 (服务: {service_name}, 耗时 {elapsed_ms:.1f} ms)")
+        return len(tools)
+    
+    def get_build_stats(self) -> Dict[str, Any]:
+        """获取索引构建统计"""
+        return dict(self._build_stats)
+    
+    @property
+    def generation(self) -> int:
+        """当前索引版本号"""
+        return self._generation
+    
+    def get_search_cache_stats(self) -> Dict[str, Any]:
+        """获取查询缓存统计"""
+        total = self._search_cache_hits + self._search_cache_misses
+        return {
+            "hits": self._search_cache_hits,
+            "misses": self._search_cache_misses,
+            "hit_rate": round(self._search_cache_hits / total, 4) if total else 0.0,
+            "size": len(self._search_cache),
+            "max_entries": self._search_cache_size,
+            "generation": self._generation
+        }
     
     def remove_service_tools(self, service_name: str) -> None:
         """移除服务的所有工具"""
@@ -76,20 +203,17 @@ class ToolIndexManager:
         
         display_names = self._service_tools[service_name]
         for display_name in display_names:
-            if display_name in self._index:
-                del self._index[display_name]
+            tool_index = self._index.pop(display_name, None)
+            if tool_index is not None:
+                self._remove_name_entry(tool_index.name, display_name)
+            if self._trigram_index is not None:
+                self._trigram_index.remove(display_name)
         
         del self._service_tools[service_name]
         
-        # 从搜索引擎移除
+        self._generation += 1
+        # 从搜索引擎移除（各引擎只处理该服务的文档）
         self._search_engine.remove_service_tools(service_name)
-        # 如果是简单引擎，需要重建索引
-        if isinstance(self._search_engine, SimpleSearchEngine):
-            # 重建索引
-            self._search_engine.clear()
-            for tool_index in self._index.values():
-                self._search_engine.add_tool(tool_index)
-            self._search_engine.commit()
         
         logger.debug(f"已移除服务 {service_name} 的所有工具 ({len(display_names)} 个)")
     
@@ -99,31 +223,218 @@ class ToolIndexManager:
         service_name: Optional[str] = None,
         limit: int = 20
     ) -> List[ToolIndex]:
-        """搜索工具（使用搜索引擎）"""
-        # 使用搜索引擎搜索
-        search_results = self._search_engine.search(query, service_name, limit)
+        """搜索工具（使用搜索引擎，结果不足时用模糊匹配补充；结果按索引版本号缓存）"""
+        return self.search_faceted(query, service_name, limit)[0]
+    
+    def search_faceted(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[ToolIndex], Dict[str, int]]:
+        """搜索工具，同时返回每个服务的命中数量（与结果一起缓存）"""
+        if self._search_cache_size <= 0:
+            return self._search(query, service_name, limit)
+        
+        key = (" ".join((query or "").lower().split()), service_name or None, limit)
+        # 调用统计写入文件后排序可能变化，一并作为缓存版本
+        version = (self._generation, self._usage_stats.version if self._usage_stats is not None else 0)
+        entry = self._search_cache.get(key)
+        if entry is not None and entry[0] == version:
+            self._search_cache.move_to_end(key)
+            self._search_cache_hits += 1
+            return list(entry[1]), dict(entry[2])
+        
+        self._search_cache_misses += 1
+        results, facets = self._search(query, service_name, limit)
+        self._search_cache[key] = (version, results, facets)
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > self._search_cache_size:
+            self._search_cache.popitem(last=False)
+        return list(results), dict(facets)
+    
+    def _search(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[ToolIndex], Dict[str, int]]:
+        """执行搜索（不使用缓存）"""
+        # 使用搜索引擎搜索（同时统计各服务命中数量）
+        use_usage = bool(query) and self._usage_stats is not None and self._usage_boost > 0
+        fetch = limit * self.USAGE_OVERFETCH if use_usage else limit
+        search_results, facets = self._search_engine.search_faceted(query, service_name, fetch)
+        # 结果取满时，其余匹配的工具可能只是排在名额之外
+        truncated = len(search_results) >= fetch
+        
+        # 拼写错误或不完整的名称：三元组候选与搜索结果合并排序
+        if query and self._trigram_index is not None:
+            search_results = self._fuse_fuzzy(query, service_name, search_results, fetch, truncated)
+        if use_usage:
+            search_results = self._rerank_by_usage(search_results)
         
         # 转换为 ToolIndex 列表
         results = []
+        seen = set()
         for result in search_results:
             display_name = result["display_name"]
-            if display_name in self._index:
-                results.append(self._index[display_name])
+            if display_name in self._index and display_name not in seen:
+                tool_index = self._index[display_name]
+                results.append(tool_index)
+                seen.add(display_name)
+                if result.get("fuzzy") and not truncated:
+                    # 只由模糊匹配找到的结果同样计入命中数量
+                    facets[tool_index.service_name] = facets.get(tool_index.service_name, 0) + 1
+                if len(results) >= limit:
+                    break
+        
+        return results, facets
+    
+    def _fuse_fuzzy(
+        self,
+        query: str,
+        service_name: Optional[str],
+        search_results: List[Dict[str, Any]],
+        fetch: int,
+        truncated: bool
+    ) -> List[Dict[str, Any]]:
+        """将三元组候选合并到搜索结果中，按 相关度 + FUZZY_WEIGHT * 三元组相似度 重新排序
+
+        相关度按最高分归一化；只由模糊匹配找到的候选，在搜索结果被截断时相关度按最后一条估计，
+        否则为 0。
+        """
+        def accept(display_name: str) -> bool:
+            tool_index = self._index.get(display_name)
+            return tool_index is not None and tool_index.service_name == service_name
         
+        fuzzy_results = self._trigram_index.search(query, fetch, accept if service_name else None)
+        if not fuzzy_results:
+            return search_results
+        
+        similarities = dict(fuzzy_results)
+        scores = [float(result.get("score") or 0.0) for result in search_results]
+        max_score = max(scores, default=0.0)
+        if max_score <= 0:
+            max_score = 1.0
+        fused = [
+            {**result, "score": score / max_score + self.FUZZY_WEIGHT * similarities.get(result["display_name"], 0.0)}
+            for result, score in zip(search_results, scores)
+        ]
+        found = {result["display_name"] for result in search_results}
+        missing_relevance = scores[-1] / max_score if truncated and scores else 0.0
+        for display_name, similarity in fuzzy_results:
+            if display_name not in found and display_name in self._index:
+                fused.append({
+                    "display_name": display_name,
+                    "score": missing_relevance + self.FUZZY_WEIGHT * similarity,
+                    "fuzzy": True
+                })
+        fused.sort(key=lambda result: result["score"], reverse=True)
+        return fused
+    
+    def _rerank_by_usage(self, search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按调用频率加成重新排序（相关度按最高分归一化，各引擎分数范围不同）"""
+        if not search_results:
+            return search_results
+        max_score = max(float(result.get("score") or 0.0) for result in search_results)
+        if max_score <= 0:
+            max_score = 1.0
+        now = time.time()
+        
+        def ranking(result: Dict[str, Any]) -> float:
+            relevance = float(result.get("score") or 0.0) / max_score
+            return relevance + self._usage_boost * self._usage_stats.get_boost(result["display_name"], now)
+        
+        return sorted(search_results, key=ranking, reverse=True)
+    
+    def record_usage(self, tool_name: str, success: bool) -> None:
+        """记录工具调用（用于搜索排序加成）"""
+        if self._usage_stats is not None:
+            self._usage_stats.record(tool_name, success)
+    
+    def flush_usage(self) -> None:
+        """将调用统计立即写入文件（退出时调用）"""
+        if self._usage_stats is not None:
+            self._usage_stats.flush()
+    
+    def get_usage_stats(self, limit: int = 10) -> Optional[Dict[str, Any]]:
+        """获取最常用工具的调用统计（未启用时返回 None）"""
+        if self._usage_stats is None:
+            return None
+        return {
+            "tools": len(self._usage_stats),
+            "top": self._usage_stats.top(limit)
+        }
+    
+    def complete(
+        self,
+        prefix: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[ToolIndex]:
+        """按名称前缀补全工具（不区分大小写，匹配显示名称或原始名称，按名称排序）"""
+        if self._prefix_generation != self._generation:
+            self._rebuild_prefix_keys()
+        
+        prefix = (prefix or "").lower()
+        keys = self._prefix_keys
+        results = []
+        seen = set()
+        position = bisect.bisect_left(keys, (prefix,))
+        while position < len(keys) and len(results) < limit:
+            key, display_name = keys[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+            if display_name in seen:
+                continue
+            tool_index = self._index.get(display_name)
+            if tool_index is None or (service_name and tool_index.service_name != service_name):
+                continue
+            seen.add(display_name)
+            results.append(tool_index)
         return results
     
+    def _rebuild_prefix_keys(self) -> None:
+        """重建前缀索引"""
+        keys = []
+        for display_name, tool_index in self._index.items():
+            key = display_name.lower()
+            keys.append((key, display_name))
+            name_key = tool_index.name.lower()
+            if name_key != key:
+                keys.append((name_key, display_name))
+        keys.sort()
+        self._prefix_keys = keys
+        self._prefix_generation = self._generation
+    
+    def _remove_name_entry(self, name: str, display_name: str) -> None:
+        """从原始名称索引中移除显示名称"""
+        display_names = self._name_index.get(name)
+        if display_names is None:
+            return
+        if display_name in display_names:
+            display_names.remove(display_name)
+        if not display_names:
+            del self._name_index[name]
+    
     def get_tool(self, tool_name: str) -> Optional[ToolIndex]:
-        """获取工具索引（支持显示名称和原始名称）"""
+        """获取工具索引（支持显示名称和原始名称）
+
+        Raises:
+            AmbiguousToolError: 原始名称对应多个工具
+        """
         # 先尝试显示名称
         if tool_name in self._index:
             return self._index[tool_name]
         
         # 尝试原始名称
-        for tool_index in self._index.values():
-            if tool_index.name == tool_name:
-                return tool_index
-        
-        return None
+        display_names = self._name_index.get(tool_name)
+        if not display_names:
+            return None
+        if len(display_names) > 1:
+            raise AmbiguousToolError(tool_name, sorted(display_names))
+        return self._index.get(display_names[0])
     
     def get_service_tools(self, service_name: str) -> List[ToolIndex]:
         """获取服务的所有工具"""
@@ -149,8 +460,14 @@ class ToolIndexManager:
     
     def clear(self) -> None:
         """清空所有索引"""
+        self._generation += 1
+        self._search_cache.clear()
+        self._prefix_keys = []
         self._index.clear()
         self._service_tools.clear()
+        self._name_index.clear()
         self._search_engine.clear()
+        if self._trigram_index is not None:
+            self._trigram_index.clear()
         logger.debug("已清空所有工具索引")
 
@@ -1,26 +1,146 @@
 """工具索引数据模型"""
 
-from dataclasses import dataclass, field
-from datetime import datetime
+import hashlib
+import json
+import sys
+import weakref
 from typing import Dict, Any, Optional
 
+from .validator import ArgumentValidator
+
+
+# 搜索结果的详细程度
+DETAIL_LEVELS = ("compact", "params", "full")
+# compact 结果中描述的最大长度
+SUMMARY_MAX_LENGTH = 120
+
+
+class SharedSchema:
+    """共享的输入 schema、参数信息和参数校验器（内容相同的 schema 只保存一份、只编译一次）"""
+
+    __slots__ = ("input_schema", "parameters", "validator", "__weakref__")
+
+    # {schema 内容哈希: SharedSchema}，没有工具引用时自动释放
+    _pool: "weakref.WeakValueDictionary[bytes, SharedSchema]" = weakref.WeakValueDictionary()
+
+    def __init__(self, input_schema: Dict[str, Any], parameters: Dict[str, Any]):
+        self.input_schema = input_schema
+        self.parameters = parameters
+        self.validator = ArgumentValidator(input_schema)
+
+    @staticmethod
+    def extract_parameters(input_schema: Dict[str, Any]) -> Dict[str, Any]:
+        """从输入 schema 提取参数信息"""
+        parameters = {}
+        if isinstance(input_schema, dict):
+            properties = input_schema.get("properties") or {}
+            required = input_schema.get("required") or []
+            for param_name, param_schema in properties.items():
+                if not isinstance(param_schema, dict):
+                    param_schema = {}
+                parameters[sys.intern(param_name)] = {
+                    "type": param_schema.get("type", "string"),
+                    "description": param_schema.get("description", ""),
+                    "required": param_name in required
+                }
+        return parameters
+
+    @classmethod
+    def get(cls, input_schema: Dict[str, Any], parameters: Optional[Dict[str, Any]] = None) -> "SharedSchema":
+        """获取内容相同的共享 schema（不存在时创建）"""
+        input_schema = input_schema or {}
+        try:
+            content = json.dumps(input_schema, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            # 无法序列化的 schema 不参与共享
+            return cls(input_schema, parameters if parameters is not None else cls.extract_parameters(input_schema))
+        if parameters is not None:
+            content += json.dumps(parameters, sort_keys=True, ensure_ascii=False, default=str)
+        key = hashlib.blake2b(content.encode("utf-8"), digest_size=16).digest()
+        shared = cls._pool.get(key)
+        if shared is None:
+            shared = cls(input_schema, parameters if parameters is not None else cls.extract_parameters(input_schema))
+            cls._pool[key] = shared
+        return shared
+
 
-@dataclass
 class ToolIndex:
-    """工具索引项"""
-    
-    name: str  # 原始工具名
-    display_name: str  # 显示名称（带前缀）
-    description: str
-    service_name: str
-    service_description: str
-    parameters: Dict[str, Any]  # 参数定义
-    input_schema: Dict[str, Any]  # 完整的输入 schema
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
+    """工具索引项
+
+    使用 __slots__ 减少内存：服务名、服务描述等重复字符串会被驻留，
+    输入 schema 和参数信息按内容共享（多个服务提供相同工具时只保存一份）。
+    """
+
+    __slots__ = ("name", "display_name", "description", "service_name", "service_description", "_schema")
+
+    def __init__(
+        self,
+        name: str,  # 原始工具名
+        display_name: str,  # 显示名称（带前缀）
+        description: str,
+        service_name: str,
+        service_description: str,
+        parameters: Optional[Dict[str, Any]] = None,  # 参数定义（为空时从 input_schema 提取）
+        input_schema: Optional[Dict[str, Any]] = None  # 完整的输入 schema
+    ):
+        self.name = sys.intern(name)
+        self.display_name = sys.intern(display_name)
+        self.description = sys.intern(description or "")
+        self.service_name = sys.intern(service_name)
+        self.service_description = sys.intern(service_description or "")
+        self._schema = SharedSchema.get(input_schema, parameters)
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        """参数定义（共享对象，不要修改）"""
+        return self._schema.parameters
+
+    @property
+    def input_schema(self) -> Dict[str, Any]:
+        """完整的输入 schema（共享对象，不要修改）"""
+        return self._schema.input_schema
+
+    @property
+    def validator(self) -> ArgumentValidator:
+        """编译后的参数校验器（随 schema 共享，工具移出索引后释放）"""
+        return self._schema.validator
+
+    def __repr__(self) -> str:
+        return f"ToolIndex(display_name={self.display_name!r}, service_name={self.service_name!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ToolIndex):
+            return NotImplemented
+        return (
+            self.display_name == other.display_name
+            and self.name == other.name
+            and self.description == other.description
+            and self.service_name == other.service_name
+            and self.service_description == other.service_description
+            and self.input_schema == other.input_schema
+        )
+
+    __hash__ = None
+
+    def to_dict(self, detail: str = "full") -> Dict[str, Any]:
+        """转换为字典
+
+        detail 为返回的详细程度：compact 只包含名称、服务和一行描述；
+        params 额外包含参数定义；full 包含完整的输入 schema。
+        """
+        if detail == "compact":
+            return {
+                "name": self.display_name,
+                "service": self.service_name,
+                "description": self.summary(),
+            }
+        if detail == "params":
+            return {
+                "name": self.display_name,
+                "service": self.service_name,
+                "description": self.description,
+                "parameters": self.parameters,
+            }
         return {
             "name": self.name,
             "display_name": self.display_name,
@@ -31,6 +151,13 @@ class ToolIndex:
             "input_schema": self.input_schema,
         }
     
+    def summary(self, max_length: int = SUMMARY_MAX_LENGTH) -> str:
+        """一行描述（取描述的第一个非空行，超长时截断）"""
+        line = next((line.strip() for line in self.description.splitlines() if line.strip()), "")
+        if len(line) > max_length:
+            line = line[:max_length - 1].rstrip() + "…"
+        return line
+    
     def matches_query(self, query: str) -> bool:
         """检查是否匹配搜索关键词"""
         query_lower = query.lower()
@@ -1,19 +1,29 @@
 """工具搜索引擎 - 基于 Whoosh"""
 
+import heapq
+import itertools
 import logging
-from typing import List, Optional, Dict, Any
+import math
+from bisect import bisect_left, insort
+from typing import List, Optional, Dict, Any, Set, Tuple
 from io import BytesIO
 
 try:
-    from whoosh import index
+    from whoosh.filedb.filestore import RamStorage
     from whoosh.fields import Schema, TEXT, ID, STORED
     from whoosh.qparser import QueryParser, MultifieldParser
-    from whoosh.query import And, Or, Term
+    from whoosh.query import And, Every, Or, Term
+    from whoosh import sorting
     WHOOSH_AVAILABLE = True
 except ImportError:
     WHOOSH_AVAILABLE = False
 
+from .analyzer import contains_cjk, tokenize
 from .models import ToolIndex
+from .tfidf_engine import NUMPY_AVAILABLE as TFIDF_AVAILABLE, TfidfSearchEngine
+
+if WHOOSH_AVAILABLE:
+    from .analyzer import cjk_analyzer
 
 logger = logging.getLogger(__name__)
 
@@ -30,25 +40,28 @@ class WhooshSearchEngine:
         
         # 定义 schema
         self.schema = Schema(
-            display_name=ID(stored=True),  # 工具显示名称（唯一）
+            display_name=ID(stored=True, unique=True),  # 工具显示名称（唯一）
             name=TEXT(stored=True),  # 原始工具名
-            description=TEXT(stored=True),  # 工具描述
+            # 中文按单字 + 双字切分，同一个词切出的多个词按 OR 匹配
+            description=TEXT(stored=True, analyzer=cjk_analyzer(), multitoken_query="or"),  # 工具描述
             service_name=ID(stored=True),  # 服务名称
             service_description=TEXT(stored=True),  # 服务描述
             parameters=TEXT(stored=True),  # 参数字符串（用于搜索）
-            content=TEXT  # 全文搜索字段（包含所有可搜索内容）
+            content=TEXT(analyzer=cjk_analyzer(), multitoken_query="or")  # 全文搜索字段（包含所有可搜索内容）
         )
         
         # 创建内存索引
-        self._index = index.create_index(self.schema, indexname="memory")
+        self._index = RamStorage().create_index(self.schema, indexname="memory")
         self._writer = None
-        self._tool_count = 0
     
-    def add_tool(self, tool_index: ToolIndex) -> None:
-        """添加工具到索引"""
+    def _get_writer(self) -> Any:
+        """获取当前写入器（在 commit 前复用同一个事务）"""
         if self._writer is None:
             self._writer = self._index.writer()
-        
+        return self._writer
+    
+    def _document(self, tool_index: ToolIndex) -> Dict[str, str]:
+        """构建工具的索引文档"""
         # 构建参数字符串（用于搜索）
         params_text = " ".join([
             f"{name} {info.get('description', '')}"
@@ -65,16 +78,25 @@ class WhooshSearchEngine:
             params_text
         ])
         
-        self._writer.add_document(
-            display_name=tool_index.display_name,
-            name=tool_index.name,
-            description=tool_index.description,
-            service_name=tool_index.service_name,
-            service_description=tool_index.service_description,
-            parameters=params_text,
-            content=content
-        )
-        self._tool_count += 1
+        return {
+            "display_name": tool_index.display_name,
+            "name": tool_index.name,
+            "description": tool_index.description,
+            "service_name": tool_index.service_name,
+            "service_description": tool_index.service_description,
+            "parameters": params_text,
+            "content": content
+        }
+    
+    def add_tool(self, tool_index: ToolIndex) -> None:
+        """添加工具到索引（同名工具会被替换）"""
+        self._get_writer().update_document(**self._document(tool_index))
+    
+    def add_tools(self, tool_indexes: List[ToolIndex]) -> None:
+        """批量添加索引中还不存在的工具（直接追加文档，不逐个按名称删除旧文档）"""
+        writer = self._get_writer()
+        for tool_index in tool_indexes:
+            writer.add_document(**self._document(tool_index))
     
     def commit(self) -> None:
         """提交索引更改"""
@@ -89,13 +111,22 @@ class WhooshSearchEngine:
         limit: int = 20
     ) -> List[Dict[str, Any]]:
         """搜索工具"""
-        if self._tool_count == 0:
-            return []
-        
+        return self.search_faceted(query, service_name, limit)[0]
+    
+    def search_faceted(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """搜索工具，同时返回每个服务的命中数量"""
         # 确保索引已提交
         if self._writer is not None:
             self.commit()
         
+        if self._index.doc_count() == 0:
+            return [], {}
+        
         with self._index.searcher() as searcher:
             # 构建查询
             query_parts = []
@@ -121,14 +152,16 @@ class WhooshSearchEngine:
                 final_query = And(query_parts)
             else:
                 # 无查询条件，返回所有
-                final_query = None
+                final_query = Every()
             
-            # 执行搜索
-            if final_query:
-                results = searcher.search(final_query, limit=limit)
-            else:
-                # 返回所有结果
-                results = searcher.documents()[:limit]
+            # 执行搜索（按服务分组计数）
+            results = searcher.search(
+                final_query,
+                limit=limit,
+                groupedby="service_name",
+                maptype=sorting.Count
+            )
+            facets = dict(results.groups("service_name"))
             
             # 转换为字典列表
             return [
@@ -138,35 +171,81 @@ class WhooshSearchEngine:
                     "description": hit["description"],
                     "service_name": hit["service_name"],
                     "service_description": hit["service_description"],
-                    "score": hit.score if hasattr(hit, "score") else 0.0
+                    "score": hit.score or 0.0
                 }
-                for hit in results
-            ]
+                for hit in itertools.islice(results, limit)
+            ], facets
     
     def remove_service_tools(self, service_name: str) -> None:
-        """移除服务的所有工具（需要重建索引）"""
-        # Whoosh 不支持直接删除，需要重建索引
-        # 这个方法标记需要重建索引
-        # 注意：实际删除操作由 ToolIndexManager 处理
-        logger.debug(f"Whoosh 索引需要重建以移除服务 {service_name} 的工具")
+        """移除服务的所有工具（按 service_name 删除文档）"""
+        self._get_writer().delete_by_term("service_name", service_name)
+        self.commit()
     
     def clear(self) -> None:
         """清空索引"""
         # 重新创建索引
-        self._index = index.create_index(self.schema, indexname="memory")
+        if self._writer is not None:
+            self._writer.cancel()
+        self._index = RamStorage().create_index(self.schema, indexname="memory")
         self._writer = None
-        self._tool_count = 0
 
 
 class SimpleSearchEngine:
-    """简单的搜索引擎（无需额外依赖，基于字符串匹配）"""
+    """简单的搜索引擎（无需额外依赖，基于词倒排表，未登录词回退到字符串匹配）"""
     
     def __init__(self):
-        self._tools: List[ToolIndex] = []
+        # 按服务分组存储：{service_name: {display_name: ToolIndex}}
+        self._service_tools: Dict[str, Dict[str, ToolIndex]] = {}
+        # 工具所属服务：{display_name: service_name}
+        self._tool_services: Dict[str, str] = {}
+        # 预先切分的词：{display_name: (名称词集合, 全部词集合)}
+        self._tool_tokens: Dict[str, Tuple[frozenset, frozenset]] = {}
+        # 词倒排表：{词: display_names}
+        self._token_tools: Dict[str, Set[str]] = {}
     
     def add_tool(self, tool_index: ToolIndex) -> None:
-        """添加工具到索引"""
-        self._tools.append(tool_index)
+        """添加工具到索引（同名工具会被替换）"""
+        display_name = tool_index.display_name
+        previous_service = self._tool_services.get(display_name)
+        if previous_service is not None:
+            self._remove_tool(previous_service, display_name)
+        self._service_tools.setdefault(tool_index.service_name, {})[display_name] = tool_index
+        self._tool_services[display_name] = tool_index.service_name
+        
+        name_tokens = frozenset(tokenize(f"{display_name} {tool_index.name}"))
+        params_text = " ".join(
+            f"{name} {info.get('description', '') if isinstance(info, dict) else ''}"
+            for name, info in tool_index.parameters.items()
+        )
+        all_tokens = name_tokens.union(
+            tokenize(tool_index.description),
+            tokenize(params_text),
+            tokenize(f"{tool_index.service_name} {tool_index.service_description}")
+        )
+        self._tool_tokens[display_name] = (name_tokens, all_tokens)
+        for token in all_tokens:
+            self._token_tools.setdefault(token, set()).add(display_name)
+    
+    def _remove_tool(self, service_name: str, display_name: str) -> None:
+        """移除单个工具"""
+        service_tools = self._service_tools.get(service_name)
+        if service_tools is not None:
+            service_tools.pop(display_name, None)
+            if not service_tools:
+                del self._service_tools[service_name]
+        self._tool_services.pop(display_name, None)
+        _, all_tokens = self._tool_tokens.pop(display_name, (None, ()))
+        for token in all_tokens:
+            tools = self._token_tools.get(token)
+            if tools is not None:
+                tools.discard(display_name)
+                if not tools:
+                    del self._token_tools[token]
+    
+    def add_tools(self, tool_indexes: List[ToolIndex]) -> None:
+        """批量添加工具"""
+        for tool_index in tool_indexes:
+            self.add_tool(tool_index)
     
     def commit(self) -> None:
         """提交索引更改（简单引擎无需提交）"""
@@ -179,50 +258,607 @@ class SimpleSearchEngine:
         limit: int = 20
     ) -> List[Dict[str, Any]]:
         """搜索工具"""
+        return self.search_faceted(query, service_name, limit)[0]
+    
+    def search_faceted(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """搜索工具，同时返回每个服务的命中数量"""
         results = []
+        facets: Dict[str, int] = {}
         
-        for tool_index in self._tools:
-            # 服务过滤
-            if service_name and tool_index.service_name != service_name:
-                continue
-            
-            # 匹配检查
-            if not query or tool_index.matches_query(query):
+        # 服务过滤：只遍历该服务的工具
+        if service_name:
+            service_tools = self._service_tools.get(service_name, {})
+            tools = service_tools.values()
+        else:
+            service_tools = None
+            tools = (
+                tool_index
+                for tools_by_name in self._service_tools.values()
+                for tool_index in tools_by_name.values()
+            )
+        
+        tokens = set(tokenize(query)) if query else set()
+        known = [token for token in tokens if token in self._token_tools]
+        if tokens and len(known) == len(tokens):
+            # 所有查询词都在倒排表中：求交集（从最短的倒排表开始）
+            postings = sorted((self._token_tools[token] for token in tokens), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            tools = self._resolve(candidates, service_name, service_tools)
+            min_overlap = len(tokens)
+        elif known and contains_cjk(query):
+            # 中文查询包含未登录词：按命中词数量排序，至少命中一半
+            candidates = set().union(*(self._token_tools[token] for token in known))
+            tools = self._resolve(candidates, service_name, service_tools)
+            min_overlap = (len(tokens) + 1) // 2
+        else:
+            # 未登录词（如不完整的英文单词）：回退到字符串匹配
+            min_overlap = None
+        
+        for tool_index in tools:
+            if min_overlap is not None:
+                name_tokens, all_tokens = self._tool_tokens[tool_index.display_name]
+                overlap = len(tokens & all_tokens)
+                if overlap < min_overlap:
+                    continue
+                score = tool_index.get_match_score(query) + 2 * len(tokens & name_tokens) + overlap
+            elif not query or tool_index.matches_query(query):
                 score = tool_index.get_match_score(query) if query else 0
-                results.append({
-                    "display_name": tool_index.display_name,
-                    "name": tool_index.name,
-                    "description": tool_index.description,
-                    "service_name": tool_index.service_name,
-                    "service_description": tool_index.service_description,
-                    "score": score
-                })
+            else:
+                continue
+            facets[tool_index.service_name] = facets.get(tool_index.service_name, 0) + 1
+            results.append({
+                "display_name": tool_index.display_name,
+                "name": tool_index.name,
+                "description": tool_index.description,
+                "service_name": tool_index.service_name,
+                "service_description": tool_index.service_description,
+                "score": score
+            })
         
         # 按分数排序
         results.sort(key=lambda x: x["score"], reverse=True)
         
-        return results[:limit]
+        return results[:limit], facets
+    
+    def _resolve(
+        self,
+        display_names: Set[str],
+        service_name: Optional[str],
+        service_tools: Optional[Dict[str, ToolIndex]]
+    ) -> List[ToolIndex]:
+        """将倒排表命中的显示名称转换为工具（按服务过滤）"""
+        if service_tools is not None:
+            return [service_tools[name] for name in display_names if name in service_tools]
+        return [
+            self._service_tools[self._tool_services[name]][name]
+            for name in display_names
+        ]
     
     def remove_service_tools(self, service_name: str) -> None:
         """移除服务的所有工具"""
-        self._tools = [
-            tool for tool in self._tools
-            if tool.service_name != service_name
-        ]
+        for display_name in list(self._service_tools.get(service_name, {})):
+            self._remove_tool(service_name, display_name)
+    
+    def clear(self) -> None:
+        """清空索引"""
+        self._service_tools.clear()
+        self._tool_services.clear()
+        self._tool_tokens.clear()
+        self._token_tools.clear()
+
+
+class Bm25SearchEngine:
+    """基于倒排索引的 BM25 搜索引擎（无需额外依赖）
+
+    文档按字段分别建立词频：名称 > 描述 > 参数 > 服务，查询时按字段权重累加 BM25 分数，
+    通过服务倒排表过滤，并用堆选取 top-k。
+    """
+    
+    # 字段顺序：名称、描述、参数、服务
+    FIELD_WEIGHTS = (3.0, 1.5, 1.0, 0.5)
+    K1 = 1.2
+    B = 0.75
+    # 查询词前缀扩展的最大词数
+    MAX_PREFIX_EXPANSIONS = 50
+    # 名称完全匹配的额外加分
+    EXACT_NAME_BONUS = 10.0
+    
+    def __init__(self):
+        self.clear()
+    
+    def add_tool(self, tool_index: ToolIndex) -> None:
+        """添加工具到索引（同名工具会被替换）"""
+        if tool_index.display_name in self._doc_ids:
+            self._remove_doc(self._doc_ids[tool_index.display_name])
+        
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        
+        params_text = " ".join(
+            f"{name} {info.get('description', '') if isinstance(info, dict) else ''}"
+            for name, info in tool_index.parameters.items()
+        )
+        fields = (
+            tokenize(f"{tool_index.display_name} {tool_index.name}"),
+            tokenize(tool_index.description),
+            tokenize(params_text),
+            tokenize(f"{tool_index.service_name} {tool_index.service_description}"),
+        )
+        
+        term_freqs: Dict[str, List[int]] = {}
+        for field_index, tokens in enumerate(fields):
+            for token in tokens:
+                freqs = term_freqs.get(token)
+                if freqs is None:
+                    freqs = term_freqs[token] = [0, 0, 0, 0]
+                freqs[field_index] += 1
+        
+        for term, freqs in term_freqs.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._sorted_terms = None
+            postings[doc_id] = tuple(freqs)
+        
+        lengths = tuple(len(tokens) for tokens in fields)
+        for field_index, length in enumerate(lengths):
+            self._total_lengths[field_index] += length
+        
+        self._docs[doc_id] = tool_index
+        self._doc_ids[tool_index.display_name] = doc_id
+        self._doc_lengths[doc_id] = lengths
+        self._doc_terms[doc_id] = list(term_freqs)
+        self._service_docs.setdefault(tool_index.service_name, set()).add(doc_id)
+        for name in {tool_index.display_name.lower(), tool_index.name.lower()}:
+            self._name_docs.setdefault(name, set()).add(doc_id)
+    
+    def _remove_doc(self, doc_id: int) -> None:
+        """从倒排索引中移除文档"""
+        tool_index = self._docs.pop(doc_id)
+        del self._doc_ids[tool_index.display_name]
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                self._sorted_terms = None
+        for field_index, length in enumerate(self._doc_lengths.pop(doc_id)):
+            self._total_lengths[field_index] -= length
+        
+        service_docs = self._service_docs.get(tool_index.service_name)
+        if service_docs is not None:
+            service_docs.discard(doc_id)
+            if not service_docs:
+                del self._service_docs[tool_index.service_name]
+        for name in {tool_index.display_name.lower(), tool_index.name.lower()}:
+            name_docs = self._name_docs.get(name)
+            if name_docs is not None:
+                name_docs.discard(doc_id)
+                if not name_docs:
+                    del self._name_docs[name]
+    
+    def add_tools(self, tool_indexes: List[ToolIndex]) -> None:
+        """批量添加工具"""
+        for tool_index in tool_indexes:
+            self.add_tool(tool_index)
+    
+    def commit(self) -> None:
+        """提交索引更改（倒排索引实时生效）"""
+        pass
+    
+    def _expand_term(self, term: str) -> List[Tuple[str, float]]:
+        """查询词扩展：精确匹配 + 前缀匹配（前缀匹配降权）"""
+        expansions = []
+        if term in self._postings:
+            expansions.append((term, 1.0))
+        
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        start = bisect_left(self._sorted_terms, term)
+        for candidate in self._sorted_terms[start:start + self.MAX_PREFIX_EXPANSIONS + 1]:
+            if not candidate.startswith(term):
+                break
+            if candidate != term:
+                expansions.append((candidate, 0.5))
+        return expansions
+    
+    def search(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """搜索工具"""
+        return self.search_faceted(query, service_name, limit)[0]
+    
+    def search_faceted(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """搜索工具，同时返回每个服务的命中数量（由打分时累积的文档集合统计）"""
+        allowed: Optional[Set[int]] = None
+        if service_name:
+            allowed = self._service_docs.get(service_name)
+            if not allowed:
+                return [], {}
+        
+        if not query:
+            doc_ids = sorted(allowed) if allowed is not None else list(self._docs)
+            if service_name:
+                facets = {service_name: len(doc_ids)}
+            else:
+                facets = {name: len(docs) for name, docs in self._service_docs.items() if docs}
+            return [self._to_result(doc_id, 0.0) for doc_id in doc_ids[:limit]], facets
+        
+        doc_count = len(self._docs)
+        if doc_count == 0:
+            return [], {}
+        avg_lengths = [max(total / doc_count, 1.0) for total in self._total_lengths]
+        
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            for expanded, boost in self._expand_term(term):
+                postings = self._postings[expanded]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5)) * boost
+                for doc_id, freqs in postings.items():
+                    if allowed is not None and doc_id not in allowed:
+                        continue
+                    lengths = self._doc_lengths[doc_id]
+                    score = 0.0
+                    for field_index, tf in enumerate(freqs):
+                        if tf:
+                            norm = self.K1 * (1 - self.B + self.B * lengths[field_index] / avg_lengths[field_index])
+                            score += self.FIELD_WEIGHTS[field_index] * tf * (self.K1 + 1) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * score
+        
+        # 名称完全匹配优先
+        for doc_id in self._name_docs.get(query.strip().lower(), ()):
+            if allowed is None or doc_id in allowed:
+                scores[doc_id] = scores.get(doc_id, 0.0) + self.EXACT_NAME_BONUS
+        
+        facets: Dict[str, int] = {}
+        docs = self._docs
+        for doc_id in scores:
+            name = docs[doc_id].service_name
+            facets[name] = facets.get(name, 0) + 1
+        
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self._to_result(doc_id, round(score, 4)) for doc_id, score in top], facets
+    
+    def _to_result(self, doc_id: int, score: float) -> Dict[str, Any]:
+        tool_index = self._docs[doc_id]
+        return {
+            "display_name": tool_index.display_name,
+            "name": tool_index.name,
+            "description": tool_index.description,
+            "service_name": tool_index.service_name,
+            "service_description": tool_index.service_description,
+            "score": score
+        }
+    
+    def remove_service_tools(self, service_name: str) -> None:
+        """移除服务的所有工具（只处理该服务的文档）"""
+        for doc_id in list(self._service_docs.get(service_name, ())):
+            self._remove_doc(doc_id)
     
     def clear(self) -> None:
         """清空索引"""
-        self._tools.clear()
+        self._docs: Dict[int, ToolIndex] = {}
+        self._doc_ids: Dict[str, int] = {}  # {display_name: doc_id}
+        self._postings: Dict[str, Dict[int, Tuple[int, ...]]] = {}  # {term: {doc_id: 各字段词频}}
+        self._doc_lengths: Dict[int, Tuple[int, ...]] = {}
+        self._doc_terms: Dict[int, List[str]] = {}
+        self._total_lengths = [0, 0, 0, 0]
+        self._service_docs: Dict[str, Set[int]] = {}  # 服务倒排表
+        self._name_docs: Dict[str, Set[int]] = {}  # 小写名称 -> 文档
+        self._sorted_terms: Optional[List[str]] = None
+        self._next_doc_id = 0
 
 
-def create_search_engine(use_whoosh: bool = True) -> Any:
-    """创建搜索引擎"""
-    if use_whoosh and WHOOSH_AVAILABLE:
+def _word_trigrams(word: str) -> frozenset:
+    """单个词的三元组集合（词首补两个空格、词尾补一个空格）"""
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """标识符三元组索引（容错/模糊匹配）
+
+    对工具名称和参数名建立索引，标识符按词拆分，三元组只在词表上建立倒排，
+    相同的词和标识符只索引一次。查询时先用三元组为每个查询词匹配相近的词，
+    再从最稀有的查询词出发生成候选标识符，按三元组 Dice 系数排序。
+    每个词的标识符按三元组数量从小到大遍历，分数上界低于当前第 limit 高的分数时提前停止，
+    并限制单次查询打分的候选总数（常见词可能对应上千个标识符）。
+    """
+    
+    # 参数名匹配的权重（低于工具名称）
+    PARAMETER_WEIGHT = 0.8
+    # 单个词的最低相似度（拼写错误的词与原词一般在 0.6 以上）
+    WORD_MIN_SIMILARITY = 0.5
+    # 最稀有查询词之外，最多再打分的候选标识符数量
+    CANDIDATE_BUDGET = 100
+    # 单次查询最多打分的候选标识符数量
+    MAX_CANDIDATES = 300
+    
+    def __init__(self, min_similarity: float = 0.3):
+        self.min_similarity = min_similarity
+        self.clear()
+    
+    def _get_word_id(self, word: str) -> int:
+        """获取词 ID（不存在时创建）"""
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._next_word_id
+            self._next_word_id += 1
+            grams = _word_trigrams(word)
+            self._word_ids[word] = word_id
+            self._word_texts[word_id] = word
+            self._word_grams[word_id] = grams
+            self._word_terms[word_id] = []
+            for gram in grams:
+                self._gram_words.setdefault(gram, set()).add(word_id)
+        return word_id
+    
+    def _get_term_id(self, text: str) -> Optional[int]:
+        """获取标识符 ID（不存在时创建）"""
+        term_id = self._term_ids.get(text)
+        if term_id is None:
+            words = list(dict.fromkeys(tokenize(text)))
+            if not words:
+                return None
+            term_id = self._next_term_id
+            self._next_term_id += 1
+            word_ids = tuple(self._get_word_id(word) for word in words)
+            self._term_ids[text] = term_id
+            self._term_texts[term_id] = text
+            self._term_words[term_id] = word_ids
+            self._term_sizes[term_id] = len(frozenset().union(*(self._word_grams[w] for w in word_ids)))
+            self._name_keys[term_id] = {}
+            self._parameter_keys[term_id] = {}
+            entry = (self._term_sizes[term_id], term_id)
+            for word_id in word_ids:
+                insort(self._word_terms[word_id], entry)
+        return term_id
+    
+    def _release_term(self, term_id: int) -> None:
+        """删除不再被引用的标识符（以及不再被引用的词）"""
+        for word_id in self._term_words.pop(term_id):
+            terms = self._word_terms[word_id]
+            terms.remove((self._term_sizes[term_id], term_id))
+            if terms:
+                continue
+            for gram in self._word_grams.pop(word_id):
+                words = self._gram_words[gram]
+                words.discard(word_id)
+                if not words:
+                    del self._gram_words[gram]
+            del self._word_terms[word_id]
+            del self._word_ids[self._word_texts.pop(word_id)]
+        del self._term_sizes[term_id]
+        del self._name_keys[term_id]
+        del self._parameter_keys[term_id]
+        del self._term_ids[self._term_texts.pop(term_id)]
+    
+    def add(self, key: str, names: List[str], parameter_names: Optional[List[str]] = None) -> None:
+        """添加条目（key 一般为工具显示名称，同 key 会被替换）"""
+        if key in self._key_terms:
+            self.remove(key)
+        term_ids = []
+        for texts, keys_by_term in ((names, self._name_keys), (parameter_names or [], self._parameter_keys)):
+            for text in texts:
+                term_id = self._get_term_id(text)
+                if term_id is not None and key not in keys_by_term[term_id]:
+                    keys_by_term[term_id][key] = None
+                    term_ids.append(term_id)
+        self._key_terms[key] = term_ids
+    
+    def remove(self, key: str) -> None:
+        """移除条目（标识符不再被引用时一并删除）"""
+        for term_id in self._key_terms.pop(key, []):
+            if term_id not in self._term_words:
+                continue
+            self._name_keys[term_id].pop(key, None)
+            self._parameter_keys[term_id].pop(key, None)
+            if not self._name_keys[term_id] and not self._parameter_keys[term_id]:
+                self._release_term(term_id)
+    
+    def _match_words(self, grams: frozenset) -> Dict[int, int]:
+        """为查询词匹配相近的词，返回 {word_id: 共享三元组数}"""
+        # Dice >= t 时至少需要共享 m = ceil(t*|Q|/(2-t)) 个三元组，
+        # 因此候选一定包含 |Q|-m+1 个最稀有三元组中的至少一个（前缀过滤）
+        threshold = self.WORD_MIN_SIMILARITY
+        size = len(grams)
+        min_overlap = max(1, math.ceil(threshold * size / (2 - threshold)))
+        present = sorted(
+            (gram for gram in grams if gram in self._gram_words),
+            key=lambda gram: len(self._gram_words[gram])
+        )
+        if len(present) < min_overlap:
+            return {}
+        candidates: Set[int] = set()
+        for gram in present[:size - min_overlap + 1]:
+            candidates.update(self._gram_words[gram])
+        
+        matches = {}
+        for word_id in candidates:
+            word_grams = self._word_grams[word_id]
+            overlap = len(grams & word_grams)
+            if 2 * overlap >= threshold * (size + len(word_grams)):
+                matches[word_id] = overlap
+        return matches
+    
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        key_filter: Optional[Any] = None
+    ) -> List[Tuple[str, float]]:
+        """模糊搜索，返回按相似度排序的 [(key, 相似度)]
+
+        Args:
+            key_filter: 可选的过滤函数，参数为 key
+        """
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words or limit <= 0:
+            return []
+        word_grams = [_word_trigrams(word) for word in words]
+        query_size = len(frozenset().union(*word_grams))
+        word_matches = [self._match_words(grams) for grams in word_grams]
+        
+        # 从最稀有的查询词开始生成候选：最稀有的词优先展开，
+        # 结果不足时再按预算展开其余（更常见的）词，避免常见词带来大量候选
+        order = sorted(
+            (i for i in range(len(words)) if word_matches[i]),
+            key=lambda i: sum(len(self._word_terms[w]) for w in word_matches[i])
+        )
+        # 每个查询词最相近的词的共享三元组数，用于计算标识符的分数上界
+        best_overlaps = [max(matches.values()) if matches else 0 for matches in word_matches]
+        max_overlap = sum(best_overlaps)
+        threshold = self.min_similarity
+        term_words_by_id = self._term_words
+        # 当前最高的 limit 个分数（最小堆，参数名按权重折算），堆满后以堆顶作为剪枝下限；
+        # 过滤条目时无法确定名额，不剪枝
+        top: List[float] = []
+        floor = -1.0
+        scored: Dict[int, float] = {}
+        remaining = self.MAX_CANDIDATES
+        matched_count = 0
+        budget: Optional[int] = None
+        for i in order:
+            if remaining <= 0 or (budget is not None and (budget <= 0 or matched_count >= limit)):
+                break
+            # 相似度高的词优先展开
+            for word_id in sorted(word_matches[i], key=word_matches[i].get, reverse=True):
+                # 经由该词到达的标识符最多共享的三元组数
+                bound = 2 * (max_overlap - best_overlaps[i] + word_matches[i][word_id])
+                if bound <= floor * (query_size + 1):
+                    break
+                for term_size, term_id in self._word_terms[word_id]:
+                    if term_id in scored:
+                        continue
+                    if bound <= floor * (query_size + term_size):
+                        # 后面的标识符三元组更多，分数上界只会更低
+                        break
+                    if remaining <= 0 or budget == 0:
+                        break
+                    remaining -= 1
+                    if budget is not None:
+                        budget -= 1
+                    term_words = term_words_by_id[term_id]
+                    overlap = 0
+                    for matches in word_matches:
+                        best = 0
+                        for w in term_words:
+                            value = matches.get(w, 0)
+                            if value > best:
+                                best = value
+                        overlap += best
+                    score = 2 * overlap / (query_size + term_size)
+                    scored[term_id] = score
+                    if score >= threshold:
+                        matched_count += 1
+                        if key_filter is None:
+                            if not self._name_keys[term_id]:
+                                score *= self.PARAMETER_WEIGHT
+                            if len(top) < limit:
+                                heapq.heappush(top, score)
+                                if len(top) == limit:
+                                    floor = top[0]
+                            elif score > floor:
+                                heapq.heapreplace(top, score)
+                                floor = top[0]
+            if budget is None:
+                budget = self.CANDIDATE_BUDGET
+        
+        # 先给标识符排序，再按分数从高到低展开到条目，凑够 limit 即停止
+        # （常见参数名可能对应大量工具，不需要全部展开）
+        entries: List[Tuple[float, int, bool]] = []
+        for term_id, similarity in scored.items():
+            if similarity < threshold:
+                continue
+            if self._name_keys[term_id]:
+                entries.append((similarity, term_id, False))
+            if self._parameter_keys[term_id]:
+                entries.append((similarity * self.PARAMETER_WEIGHT, term_id, True))
+        entries.sort(key=lambda entry: entry[0], reverse=True)
+        
+        results: List[Tuple[str, float]] = []
+        seen: Set[str] = set()
+        for score, term_id, is_parameter in entries:
+            keys = self._parameter_keys[term_id] if is_parameter else self._name_keys[term_id]
+            for key in keys:
+                if key in seen or (key_filter is not None and not key_filter(key)):
+                    continue
+                seen.add(key)
+                results.append((key, round(score, 4)))
+                if len(results) >= limit:
+                    return results
+        return results
+    
+    def clear(self) -> None:
+        """清空索引"""
+        # 词表：{词: word_id}，以及三元组 -> 词 的倒排表
+        self._word_ids: Dict[str, int] = {}
+        self._word_texts: Dict[int, str] = {}
+        self._word_grams: Dict[int, frozenset] = {}
+        # {word_id: [(三元组数量, term_id)]}：包含该词的标识符，按三元组数量排序
+        self._word_terms: Dict[int, List[Tuple[int, int]]] = {}
+        self._gram_words: Dict[str, Set[int]] = {}
+        # 标识符：{标识符: term_id}
+        self._term_ids: Dict[str, int] = {}
+        self._term_texts: Dict[int, str] = {}
+        self._term_words: Dict[int, Tuple[int, ...]] = {}
+        self._term_sizes: Dict[int, int] = {}  # 标识符的三元组数量
+        # {term_id: {key: None}}（用 dict 保持插入顺序）
+        self._name_keys: Dict[int, Dict[str, None]] = {}
+        self._parameter_keys: Dict[int, Dict[str, None]] = {}
+        self._key_terms: Dict[str, List[int]] = {}
+        self._next_word_id = 0
+        self._next_term_id = 0
+    
+    def __len__(self) -> int:
+        return len(self._key_terms)
+
+
+SEARCH_ENGINES = ("whoosh", "simple", "bm25", "tfidf")
+
+
+def create_search_engine(
+    use_whoosh: bool = True,
+    engine: Optional[str] = None,
+    lsa_components: int = 0
+) -> Any:
+    """创建搜索引擎
+
+    Args:
+        use_whoosh: 未指定 engine 时是否优先使用 Whoosh
+        engine: 引擎名称：whoosh / simple / bm25 / tfidf
+        lsa_components: tfidf 引擎的 LSA 降维维数，0 表示不降维
+    """
+    if engine is None:
+        engine = "whoosh" if use_whoosh else "simple"
+    
+    if engine == "bm25":
+        return Bm25SearchEngine()
+    if engine == "tfidf":
+        if TFIDF_AVAILABLE:
+            return TfidfSearchEngine(lsa_components=lsa_components)
+        logger.warning("NumPy 未安装，TF-IDF 引擎不可用，使用 BM25 引擎")
+        return Bm25SearchEngine()
+    if engine == "whoosh" and WHOOSH_AVAILABLE:
         try:
             return WhooshSearchEngine()
         except Exception as e:
             logger.warning(f"创建 Whoosh 搜索引擎失败，使用简单引擎: {e}")
             return SimpleSearchEngine()
-    else:
-        return SimpleSearchEngine()
+    if engine not in SEARCH_ENGINES:
+        logger.warning(f"未知的搜索引擎 {engine}，使用简单引擎")
+    return SimpleSearchEngine()
 
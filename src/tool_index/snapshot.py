@@ -0,0 +1,171 @@
+"""工具目录快照（持久化各服务的工具列表，用于启动时预加载）"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from mcp.types import Tool
+
+from ..config.models import McpServerConfig
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(payload: Any) -> str:
+    """计算规范化 JSON 的 SHA-256"""
+    text = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CatalogSnapshot:
+    """工具目录快照
+
+    按服务保存工具列表、配置指纹和目录哈希。配置指纹不一致时快照失效；
+    目录哈希用于判断服务上线后工具列表是否变化。
+    在事件循环中更新时，写入延迟 SAVE_DELAY 秒合并（启动时多个服务先后上线只写一次），
+    文件 I/O 在线程池中执行。
+    """
+
+    VERSION = 1
+    # 有变化后延迟写入的时间（秒）
+    SAVE_DELAY = 2.0
+
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        # {service_name: {"fingerprint", "catalog_hash", "tools", "updated_at"}}
+        self._services: Dict[str, Dict[str, Any]] = {}
+        # 后台写入：延迟写入的定时器，以及按序号丢弃过期的写入
+        self._dirty = False
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._write_lock = threading.Lock()
+        self._save_seq = 0
+        self._written_seq = 0
+        self.load()
+
+    @staticmethod
+    def fingerprint(server_config: McpServerConfig) -> str:
+        """计算影响工具列表的配置指纹（连接方式、环境变量、前缀、描述）"""
+        return _digest(server_config.model_dump(include={"connection", "env", "prefix", "description"}))
+
+    @staticmethod
+    def catalog_hash(tools: List[Tool]) -> str:
+        """计算工具列表哈希"""
+        return _digest([tool.model_dump(mode="json", exclude_none=True) for tool in tools])
+
+    def load(self) -> None:
+        """从文件加载快照（文件不存在或格式错误时忽略）"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self._services = data.get("services", {})
+        except Exception as e:
+            logger.warning(f"加载工具目录快照失败，忽略: {e}")
+            self._services = {}
+
+    def save(self) -> None:
+        """标记快照有变化：在事件循环中延迟后在线程池中写入，否则立即写入"""
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.SAVE_DELAY, self._flush_in_background, loop)
+
+    def _flush_in_background(self, loop: asyncio.AbstractEventLoop) -> None:
+        """定时器回调：在线程池中写入文件"""
+        self._flush_handle = None
+        payload = self._prepare_flush()
+        if payload is not None:
+            loop.run_in_executor(None, self._write, *payload)
+
+    def flush(self) -> None:
+        """立即写入未保存的变化（同步，用于退出时）"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        payload = self._prepare_flush()
+        if payload is not None:
+            self._write(*payload)
+
+    def _prepare_flush(self) -> Optional[Tuple[Dict[str, Any], int]]:
+        """生成待写入的数据（没有变化时返回 None）"""
+        if not self._dirty:
+            return None
+        self._dirty = False
+        self._save_seq += 1
+        # 更新时整体替换各服务的条目，复制字典即可
+        return {"version": self.VERSION, "services": dict(self._services)}, self._save_seq
+
+    def _write(self, data: Dict[str, Any], seq: int) -> None:
+        """写入快照文件（先写临时文件再替换）；比已写入的数据旧时跳过"""
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._written_seq = seq
+            except Exception as e:
+                logger.warning(f"保存工具目录快照失败: {e}")
+
+    def get_tools(self, server_config: McpServerConfig) -> Optional[List[Tool]]:
+        """获取服务的缓存工具列表（配置指纹不一致时返回 None）"""
+        entry = self._services.get(server_config.name)
+        if not entry or entry.get("fingerprint") != self.fingerprint(server_config):
+            return None
+        try:
+            return [Tool.model_validate(tool) for tool in entry.get("tools", [])]
+        except Exception as e:
+            logger.warning(f"解析服务 {server_config.name} 的工具目录快照失败: {e}")
+            return None
+
+    def get_catalog_hash(self, service_name: str) -> Optional[str]:
+        """获取服务的缓存目录哈希"""
+        entry = self._services.get(service_name)
+        return entry.get("catalog_hash") if entry else None
+
+    def matches(self, server_config: McpServerConfig, tools: List[Tool]) -> bool:
+        """快照中服务的配置指纹和目录哈希是否都与当前一致"""
+        entry = self._services.get(server_config.name)
+        return bool(entry) and (
+            entry.get("fingerprint") == self.fingerprint(server_config)
+            and entry.get("catalog_hash") == self.catalog_hash(tools)
+        )
+
+    def update(self, server_config: McpServerConfig, tools: List[Tool]) -> bool:
+        """更新服务的工具列表，返回目录是否变化"""
+        if self.matches(server_config, tools):
+            return False
+        fingerprint = self.fingerprint(server_config)
+        catalog_hash = self.catalog_hash(tools)
+        self._services[server_config.name] = {
+            "fingerprint": fingerprint,
+            "catalog_hash": catalog_hash,
+            "tools": [tool.model_dump(mode="json", exclude_none=True) for tool in tools],
+            "updated_at": time.time()
+        }
+        self.save()
+        return True
+
+    def retain(self, service_names: Iterable[str]) -> None:
+        """只保留指定服务的快照（清理已删除的服务）"""
+        names = set(service_names)
+        removed = [name for name in self._services if name not in names]
+        for name in removed:
+            del self._services[name]
+        if removed:
+            self.save()
@@ -0,0 +1,337 @@
+"""TF-IDF 向量搜索引擎（基于 NumPy，可选 SciPy LSA 降维）"""
+
+import logging
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.linalg import svds
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+from .analyzer import tokenize
+from .models import ToolIndex
+
+logger = logging.getLogger(__name__)
+
+
+class _ServiceBlock:
+    """单个服务的稀疏词频矩阵（按词排序的 CSC 风格存储）"""
+
+    __slots__ = ("tools", "terms", "docs", "tf", "unique_terms", "starts", "weights", "norms")
+
+    def __init__(self, tools: List[ToolIndex], terms: Any, docs: Any, tf: Any):
+        self.tools = tools
+        order = np.argsort(terms, kind="stable")
+        self.terms = terms[order]
+        self.docs = docs[order]
+        self.tf = tf[order]
+        # 每个词在 terms 中的起止位置
+        self.unique_terms, self.starts = np.unique(self.terms, return_index=True)
+        self.starts = np.append(self.starts, len(self.terms))
+        self.weights = self.tf
+        self.norms = np.ones(len(tools))
+
+    @classmethod
+    def from_tools(cls, tools: List[ToolIndex], vocabulary: Dict[str, int]) -> "_ServiceBlock":
+        """由工具列表构建（新词追加到词表）"""
+        term_list: List[int] = []
+        doc_list: List[int] = []
+        tf_list: List[float] = []
+        for doc, tool_index in enumerate(tools):
+            for term, tf in TfidfSearchEngine.term_frequencies(tool_index).items():
+                term_id = vocabulary.get(term)
+                if term_id is None:
+                    term_id = vocabulary[term] = len(vocabulary)
+                term_list.append(term_id)
+                doc_list.append(doc)
+                tf_list.append(tf)
+        return cls(
+            tools,
+            np.asarray(term_list, dtype=np.int64),
+            np.asarray(doc_list, dtype=np.int64),
+            np.asarray(tf_list, dtype=np.float64)
+        )
+
+    @classmethod
+    def merge(cls, blocks: List["_ServiceBlock"]) -> "_ServiceBlock":
+        """合并多个已计算权重的块（用于不按服务过滤的查询）"""
+        offsets = np.cumsum([0] + [len(block.tools) for block in blocks[:-1]])
+        merged = cls(
+            [tool_index for block in blocks for tool_index in block.tools],
+            np.concatenate([block.terms for block in blocks]),
+            np.concatenate([block.docs + offset for block, offset in zip(blocks, offsets)]),
+            np.concatenate([block.weights for block in blocks])
+        )
+        merged.weights = merged.tf
+        merged.norms = np.concatenate([block.norms for block in blocks])
+        return merged
+
+    def document_frequencies(self) -> Any:
+        """块内每个词的文档数（与 unique_terms 对应）"""
+        return np.diff(self.starts)
+
+    def reweight(self, idf: Any) -> None:
+        """按全局 IDF 重新计算权重和文档向量长度"""
+        self.weights = self.tf * idf[self.terms]
+        norms = np.sqrt(np.bincount(self.docs, weights=self.weights ** 2, minlength=len(self.tools)))
+        norms[norms == 0] = 1.0
+        self.norms = norms
+
+    def score(self, query_ids: Any, query_weights: Any) -> Any:
+        """计算查询与块内所有文档的余弦相似度（未除以查询向量长度）"""
+        scores = np.zeros(len(self.tools))
+        if not len(self.unique_terms):
+            return scores
+        positions = np.searchsorted(self.unique_terms, query_ids)
+        positions[positions >= len(self.unique_terms)] = 0
+        found = self.unique_terms[positions] == query_ids
+        for position, weight in zip(positions[found], query_weights[found]):
+            start, end = self.starts[position], self.starts[position + 1]
+            # 同一个词在每个文档中只出现一次，可以直接按下标累加
+            scores[self.docs[start:end]] += self.weights[start:end] * weight
+        return scores / self.norms
+
+
+class TfidfSearchEngine:
+    """TF-IDF 向量搜索引擎
+
+    每个服务单独构建一个稀疏矩阵块，增删服务只重建该服务的块；全局 IDF 和文档向量长度
+    在下一次搜索时统一重算。查询用向量化的余弦相似度打分，argpartition 选取 top-k。
+    启用 LSA（需要 SciPy）时，额外在降维后的语义空间中计算相似度并与 TF-IDF 分数混合，
+    可以匹配用词不同但经常一起出现的描述。
+    """
+
+    # 字段权重：名称 > 描述 > 参数 > 服务
+    FIELD_WEIGHTS = (3.0, 1.5, 1.0, 0.5)
+    # LSA 分数在最终分数中的占比
+    LSA_WEIGHT = 0.5
+    # 只靠 LSA 命中的结果的最低分数
+    LSA_MIN_SCORE = 0.1
+
+    def __init__(self, lsa_components: int = 0):
+        if not NUMPY_AVAILABLE:
+            raise ImportError(
+                "NumPy 未安装。请运行: pip install numpy\n"
+                "或者使用 Bm25SearchEngine（无需额外依赖）"
+            )
+        if lsa_components > 0 and not SCIPY_AVAILABLE:
+            logger.warning("SciPy 未安装，TF-IDF 引擎不启用 LSA 降维")
+            lsa_components = 0
+        self.lsa_components = lsa_components
+        self.clear()
+
+    @classmethod
+    def term_frequencies(cls, tool_index: ToolIndex) -> Dict[str, float]:
+        """计算文档的加权词频（按字段权重，对数平滑）"""
+        params_text = " ".join(
+            f"{name} {info.get('description', '') if isinstance(info, dict) else ''}"
+            for name, info in tool_index.parameters.items()
+        )
+        fields = (
+            f"{tool_index.display_name} {tool_index.name}",
+            tool_index.description,
+            params_text,
+            f"{tool_index.service_name} {tool_index.service_description}",
+        )
+        frequencies: Dict[str, float] = {}
+        for weight, text in zip(cls.FIELD_WEIGHTS, fields):
+            for term, count in Counter(tokenize(text)).items():
+                frequencies[term] = frequencies.get(term, 0.0) + weight * (1 + math.log(count))
+        return frequencies
+
+    def add_tool(self, tool_index: ToolIndex) -> None:
+        """添加工具到索引（commit 后生效，同名工具会被替换）"""
+        previous_service = self._tool_services.get(tool_index.display_name)
+        if previous_service is not None and previous_service != tool_index.service_name:
+            self._service_tools[previous_service].pop(tool_index.display_name, None)
+            self._dirty_services.add(previous_service)
+        self._service_tools.setdefault(tool_index.service_name, {})[tool_index.display_name] = tool_index
+        self._tool_services[tool_index.display_name] = tool_index.service_name
+        self._dirty_services.add(tool_index.service_name)
+
+    def add_tools(self, tool_indexes: List[ToolIndex]) -> None:
+        """批量添加工具（commit 后生效）"""
+        for tool_index in tool_indexes:
+            self.add_tool(tool_index)
+
+    def commit(self) -> None:
+        """重建有变化的服务块"""
+        for service_name in self._dirty_services:
+            tools = list(self._service_tools.get(service_name, {}).values())
+            if tools:
+                self._blocks[service_name] = _ServiceBlock.from_tools(tools, self._vocabulary)
+            else:
+                self._blocks.pop(service_name, None)
+                self._service_tools.pop(service_name, None)
+        if self._dirty_services:
+            self._dirty_services.clear()
+            self._weights_dirty = True
+
+    def _refresh_weights(self) -> None:
+        """重新计算全局 IDF、文档权重和 LSA 模型"""
+        doc_count = sum(len(block.tools) for block in self._blocks.values())
+        document_frequencies = np.zeros(len(self._vocabulary))
+        for block in self._blocks.values():
+            document_frequencies[block.unique_terms] += block.document_frequencies()
+        self._idf = np.log((1 + doc_count) / (1 + document_frequencies)) + 1
+        for block in self._blocks.values():
+            block.reweight(self._idf)
+        self._merged = _ServiceBlock.merge(list(self._blocks.values())) if self._blocks else None
+        # 合并矩阵中每个文档所属服务的编号（用于统计各服务命中数量）
+        self._merged_services = list(self._blocks)
+        self._merged_service_ids = np.repeat(
+            np.arange(len(self._blocks)), [len(block.tools) for block in self._blocks.values()]
+        )
+        self._weights_dirty = False
+
+        self._lsa_docs = None
+        self._lsa_terms = None
+        if self.lsa_components > 0 and doc_count > 2:
+            self._build_lsa(doc_count)
+
+    def _build_lsa(self, doc_count: int) -> None:
+        """对全部文档的 TF-IDF 矩阵做截断 SVD"""
+        components = min(self.lsa_components, doc_count - 1, len(self._vocabulary) - 1)
+        if components < 1:
+            return
+        merged = self._merged
+        matrix = csr_matrix(
+            (merged.weights / merged.norms[merged.docs], (merged.docs, merged.terms)),
+            shape=(doc_count, len(self._vocabulary))
+        )
+        try:
+            u, s, vt = svds(matrix, k=components)
+        except Exception as e:
+            logger.warning(f"LSA 降维失败，仅使用 TF-IDF: {e}")
+            return
+        docs = u * s
+        lengths = np.linalg.norm(docs, axis=1)
+        lengths[lengths == 0] = 1.0
+        self._lsa_docs = docs / lengths[:, None]
+        self._lsa_terms = vt
+        logger.debug(f"LSA 模型已更新：{doc_count} 个文档，{components} 维")
+
+    def search(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """搜索工具"""
+        return self.search_faceted(query, service_name, limit)[0]
+
+    def search_faceted(
+        self,
+        query: str,
+        service_name: Optional[str] = None,
+        limit: int = 20
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """搜索工具，同时返回每个服务的命中数量（对命中文档的服务编号做 bincount）"""
+        if self._dirty_services:
+            self.commit()
+        if service_name and service_name not in self._blocks:
+            return [], {}
+        if not query:
+            if service_name:
+                tools = self._blocks[service_name].tools
+                facets = {service_name: len(tools)}
+            else:
+                tools = [tool_index for block in self._blocks.values() for tool_index in block.tools]
+                facets = {name: len(block.tools) for name, block in self._blocks.items()}
+            return [self._to_result(tool_index, 0.0) for tool_index in tools[:limit]], facets
+
+        if self._weights_dirty:
+            self._refresh_weights()
+        counts = Counter(term for term in tokenize(query) if term in self._vocabulary)
+        if not counts or self._merged is None:
+            return [], {}
+        # 按服务过滤时只计算该服务的块，否则使用合并后的矩阵
+        block = self._blocks[service_name] if service_name else self._merged
+        query_ids = np.fromiter((self._vocabulary[term] for term in counts), dtype=np.int64, count=len(counts))
+        query_weights = np.fromiter(
+            (1 + math.log(count) for count in counts.values()), dtype=np.float64, count=len(counts)
+        ) * self._idf[query_ids]
+        query_norm = float(np.linalg.norm(query_weights)) or 1.0
+
+        scores = block.score(query_ids, query_weights) / query_norm
+        if self._lsa_docs is not None:
+            scores = self._blend_lsa(scores, service_name, query_ids, query_weights / query_norm)
+
+        candidates = np.flatnonzero(scores > 0)
+        if service_name:
+            facets = {service_name: len(candidates)} if len(candidates) else {}
+        else:
+            service_counts = np.bincount(self._merged_service_ids[candidates], minlength=len(self._merged_services))
+            facets = {
+                self._merged_services[i]: int(service_counts[i]) for i in np.flatnonzero(service_counts)
+            }
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [self._to_result(block.tools[i], round(float(scores[i]), 4)) for i in candidates], facets
+
+    def _blend_lsa(self, scores: Any, service_name: Optional[str], query_ids: Any, query_weights: Any) -> Any:
+        """混合 LSA 语义相似度"""
+        query_vector = self._lsa_terms[:, query_ids] @ query_weights
+        length = float(np.linalg.norm(query_vector))
+        if length == 0:
+            return scores
+        lsa_docs = self._lsa_docs
+        if service_name:
+            # 按服务过滤时只取该服务的文档（与合并矩阵中的顺序一致）
+            offset = 0
+            for name, block in self._blocks.items():
+                if name == service_name:
+                    break
+                offset += len(block.tools)
+            lsa_docs = lsa_docs[offset:offset + len(self._blocks[service_name].tools)]
+        lsa_scores = np.clip(lsa_docs @ (query_vector / length), 0, None)
+        blended = (1 - self.LSA_WEIGHT) * scores + self.LSA_WEIGHT * lsa_scores
+        # 没有共同词的文档只在语义相似度足够高时保留
+        blended[(scores == 0) & (lsa_scores < self.LSA_MIN_SCORE)] = 0
+        return blended
+
+    @staticmethod
+    def _to_result(tool_index: ToolIndex, score: float) -> Dict[str, Any]:
+        return {
+            "display_name": tool_index.display_name,
+            "name": tool_index.name,
+            "description": tool_index.description,
+            "service_name": tool_index.service_name,
+            "service_description": tool_index.service_description,
+            "score": score
+        }
+
+    def remove_service_tools(self, service_name: str) -> None:
+        """移除服务的所有工具（只删除该服务的块）"""
+        for display_name in self._service_tools.pop(service_name, {}):
+            self._tool_services.pop(display_name, None)
+        self._dirty_services.discard(service_name)
+        if self._blocks.pop(service_name, None) is not None:
+            self._weights_dirty = True
+
+    def clear(self) -> None:
+        """清空索引"""
+        self._vocabulary: Dict[str, int] = {}  # {词: 列号}
+        self._service_tools: Dict[str, Dict[str, ToolIndex]] = {}
+        self._tool_services: Dict[str, str] = {}
+        self._blocks: Dict[str, _ServiceBlock] = {}
+        self._merged: Optional[_ServiceBlock] = None  # 所有服务合并后的矩阵
+        self._merged_services: List[str] = []
+        self._merged_service_ids = None
+        self._dirty_services: Set[str] = set()
+        self._weights_dirty = False
+        self._idf = None
+        self._lsa_docs = None
+        self._lsa_terms = None
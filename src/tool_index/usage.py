@@ -0,0 +1,166 @@
+"""工具调用统计（按时间衰减，用于搜索排序加成）"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UsageStats:
+    """工具调用统计
+
+    按显示名称记录每个工具的调用次数和成功次数，数值按半衰期指数衰减（近期调用权重更高）。
+    统计定期写入 JSON 文件，重启后保留；version 在每次写入时递增，供查询缓存判断排序是否过期。
+    在事件循环中记录时，写入延迟到距上次写入 SAVE_INTERVAL 秒后合并进行，文件 I/O 在线程池中执行。
+    """
+
+    VERSION = 1
+    # 两次写入文件的最小间隔（秒）
+    SAVE_INTERVAL = 30
+    # 衰减后调用次数（按成功率折算）达到该值时加成为 0.5
+    BOOST_HALF_CALLS = 5.0
+    # 衰减后调用次数低于该值的记录在写入时清理
+    MIN_CALLS = 0.01
+
+    def __init__(self, path: Optional[str] = None, half_life_days: float = 7.0):
+        self.path = Path(path).expanduser() if path else None
+        self.half_life = max(half_life_days, 0.0) * 86400
+        # {display_name: [衰减后调用次数, 衰减后成功次数, 最后更新时间]}
+        self._tools: Dict[str, List[float]] = {}
+        self._dirty = False
+        self._last_save = time.time()
+        self.version = 0
+        # 后台写入：延迟写入的定时器，以及按序号丢弃过期的写入
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._write_lock = threading.Lock()
+        self._save_seq = 0
+        self._written_seq = 0
+        self.load()
+
+    def _decayed(self, entry: List[float], now: float) -> List[float]:
+        """按经过的时间衰减"""
+        if self.half_life <= 0 or now <= entry[2]:
+            return entry
+        factor = 0.5 ** ((now - entry[2]) / self.half_life)
+        return [entry[0] * factor, entry[1] * factor, now]
+
+    def record(self, tool_name: str, success: bool, now: Optional[float] = None) -> None:
+        """记录一次工具调用"""
+        now = time.time() if now is None else now
+        entry = self._tools.get(tool_name)
+        calls, successes, _ = self._decayed(entry, now) if entry else (0.0, 0.0, now)
+        self._tools[tool_name] = [calls + 1, successes + (1 if success else 0), now]
+        self._dirty = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None:
+            if now - self._last_save >= self.SAVE_INTERVAL:
+                self.flush(now)
+        elif self._flush_handle is None:
+            delay = max(self.SAVE_INTERVAL - (now - self._last_save), 0)
+            self._flush_handle = loop.call_later(delay, self._flush_in_background, loop)
+
+    def get_boost(self, tool_name: str, now: Optional[float] = None) -> float:
+        """获取排序加成（0-1，调用越多、成功率越高越大）"""
+        entry = self._tools.get(tool_name)
+        if not entry:
+            return 0.0
+        calls, successes, _ = self._decayed(entry, time.time() if now is None else now)
+        # 成功率做拉普拉斯平滑，避免少量调用时波动过大
+        weight = calls * (successes + 1) / (calls + 2)
+        return weight / (weight + self.BOOST_HALF_CALLS)
+
+    def get_stats(self, tool_name: str, now: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """获取工具的衰减后调用次数和成功率"""
+        entry = self._tools.get(tool_name)
+        if not entry:
+            return None
+        calls, successes, updated_at = self._decayed(entry, time.time() if now is None else now)
+        return {
+            "calls": round(calls, 3),
+            "success_rate": round(successes / calls, 4) if calls else 0.0,
+            "last_used": entry[2]
+        }
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """按衰减后调用次数返回最常用的工具"""
+        now = time.time()
+        names = sorted(self._tools, key=lambda name: self._decayed(self._tools[name], now)[0], reverse=True)
+        return [{"tool_name": name, **self.get_stats(name, now)} for name in names[:limit]]
+
+    def load(self) -> None:
+        """从文件加载统计（文件不存在或格式错误时忽略）"""
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self._tools = {
+                    name: [float(value) for value in entry[:3]]
+                    for name, entry in data.get("tools", {}).items()
+                    if isinstance(entry, list) and len(entry) >= 3
+                }
+        except Exception as e:
+            logger.warning(f"加载工具调用统计失败，忽略: {e}")
+            self._tools = {}
+
+    def _flush_in_background(self, loop: asyncio.AbstractEventLoop) -> None:
+        """定时器回调：在线程池中写入文件"""
+        self._flush_handle = None
+        payload = self._prepare_flush()
+        if payload is not None:
+            loop.run_in_executor(None, self._write, *payload)
+
+    def flush(self, now: Optional[float] = None) -> None:
+        """立即写入统计文件（同步，用于退出时），并清理已衰减到可忽略的记录"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        payload = self._prepare_flush(now)
+        if payload is not None:
+            self._write(*payload)
+
+    def _prepare_flush(self, now: Optional[float] = None) -> Optional[Tuple[Dict[str, Any], int]]:
+        """清理记录并生成待写入的数据（没有变化或未配置文件时返回 None）"""
+        if not self._dirty:
+            return None
+        now = time.time() if now is None else now
+        self._tools = {
+            name: entry for name, entry in self._tools.items()
+            if self._decayed(entry, now)[0] >= self.MIN_CALLS
+        }
+        self._dirty = False
+        self._last_save = now
+        self.version += 1
+        if self.path is None:
+            return None
+        self._save_seq += 1
+        # 记录时会替换而不是修改各工具的列表，复制字典即可
+        return {"version": self.VERSION, "tools": dict(self._tools)}, self._save_seq
+
+    def _write(self, data: Dict[str, Any], seq: int) -> None:
+        """写入文件（先写临时文件再替换）；比已写入的数据旧时跳过"""
+        with self._write_lock:
+            if seq <= self._written_seq:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._written_seq = seq
+            except Exception as e:
+                logger.warning(f"保存工具调用统计失败: {e}")
+
+    def __len__(self) -> int:
+        return len(self._tools)
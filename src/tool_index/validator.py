@@ -0,0 +1,152 @@
+"""工具参数校验（基于 jsonschema，按 schema 编译一次后复用）"""
+
+import json
+import logging
+import math
+from typing import Any, Dict, List, Tuple
+
+try:
+    from jsonschema import Draft202012Validator
+    from jsonschema.validators import validator_for
+    JSONSCHEMA_AVAILABLE = True
+except ImportError:
+    JSONSCHEMA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 单次校验最多返回的错误数量
+MAX_ERRORS = 10
+
+_TRUE_STRINGS = {"true", "1", "yes", "on"}
+_FALSE_STRINGS = {"false", "0", "no", "off"}
+
+
+def _format_path(path: Any) -> str:
+    """将错误位置格式化为 a.b[0] 形式"""
+    text = ""
+    for part in path:
+        if isinstance(part, int):
+            text += f"[{part}]"
+        else:
+            text += f".{part}" if text else str(part)
+    return text
+
+
+def _schema_types(schema: Dict[str, Any]) -> List[str]:
+    types = schema.get("type")
+    if isinstance(types, str):
+        return [types]
+    return [t for t in types if isinstance(t, str)] if isinstance(types, list) else []
+
+
+def _coerce_value(schema: Any, value: Any) -> Any:
+    """按 schema 声明的类型转换常见的错误格式（如 "5" -> 5、"true" -> True、JSON 字符串 -> 对象）"""
+    if not isinstance(schema, dict):
+        return value
+    types = _schema_types(schema)
+    if isinstance(value, str) and types and "string" not in types:
+        text = value.strip()
+        for expected in types:
+            try:
+                if expected == "integer" and text.lstrip("+-").isdigit():
+                    return int(text)
+                if expected == "number":
+                    number = float(text)
+                    if not math.isfinite(number):
+                        continue
+                    return int(number) if number.is_integer() and "." not in text and "e" not in text.lower() else number
+                if expected == "boolean" and text.lower() in _TRUE_STRINGS | _FALSE_STRINGS:
+                    return text.lower() in _TRUE_STRINGS
+                if expected in ("array", "object") and text[:1] in "[{":
+                    parsed = json.loads(text)
+                    if isinstance(parsed, list if expected == "array" else dict):
+                        value = parsed
+                        break
+                if expected == "null" and text.lower() in ("null", "none"):
+                    return None
+            except ValueError:
+                continue
+    elif isinstance(value, (int, float)) and not isinstance(value, bool) and types == ["string"]:
+        return str(value)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool) and types == ["integer"]:
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+
+    if isinstance(value, dict):
+        properties = schema.get("properties")
+        if isinstance(properties, dict):
+            return {
+                key: _coerce_value(properties.get(key), item) if key in properties else item
+                for key, item in value.items()
+            }
+    elif isinstance(value, list) and not isinstance(schema.get("items"), list):
+        items = schema.get("items")
+        if isinstance(items, dict):
+            return [_coerce_value(items, item) for item in value]
+    return value
+
+
+def _error_to_dict(error: Any) -> Dict[str, Any]:
+    """将 jsonschema 错误转换为结构化错误（只附带简单的期望值，不返回整段子 schema）"""
+    item = {
+        "path": _format_path(error.absolute_path),
+        "message": error.message,
+        "validator": error.validator
+    }
+    if error.validator in ("type", "enum", "const", "required") or not isinstance(error.validator_value, (dict, list)):
+        item["expected"] = error.validator_value
+    return item
+
+
+class ArgumentValidator:
+    """编译后的工具参数校验器
+
+    索引时只创建 jsonschema 校验器（不做元 schema 检查，约 10 微秒）；schema 本身有误导致
+    校验异常时，记录一次警告并退化为只检查必需参数。未安装 jsonschema 时同样只检查必需参数。
+    """
+
+    __slots__ = ("schema", "_validator", "_required")
+
+    def __init__(self, input_schema: Dict[str, Any]):
+        self.schema = input_schema if isinstance(input_schema, dict) else {}
+        required = self.schema.get("required")
+        self._required: Tuple[str, ...] = tuple(required) if isinstance(required, list) else ()
+        self._validator = None
+        if JSONSCHEMA_AVAILABLE and self.schema:
+            try:
+                self._validator = validator_for(self.schema, default=Draft202012Validator)(self.schema)
+            except Exception as e:
+                logger.warning(f"编译参数 schema 失败，只检查必需参数: {e}")
+
+    def coerce(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """按 schema 转换参数类型（不修改传入的字典）"""
+        return _coerce_value(self.schema, arguments)
+
+    def missing_required(self, arguments: Any) -> List[str]:
+        """缺少的顶层必需参数"""
+        if not isinstance(arguments, dict):
+            return list(self._required)
+        return [name for name in self._required if name not in arguments]
+
+    def validate(self, arguments: Any) -> List[Dict[str, Any]]:
+        """校验参数，返回结构化错误列表（为空表示通过）"""
+        if not isinstance(arguments, dict):
+            return [{"path": "", "message": "参数必须是 JSON 对象", "validator": "type", "expected": "object"}]
+
+        if self._validator is not None:
+            try:
+                errors = sorted(self._validator.iter_errors(arguments), key=lambda error: _format_path(error.absolute_path))
+            except Exception as e:
+                logger.warning(f"参数 schema 无法用于校验，只检查必需参数: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+                self._validator = None
+            else:
+                return [_error_to_dict(error) for error in errors[:MAX_ERRORS]]
+
+        return self.required_errors(arguments)
+
+    def required_errors(self, arguments: Any) -> List[Dict[str, Any]]:
+        """只检查顶层必需参数，返回与 validate 相同格式的错误"""
+        return [
+            {"path": "", "message": f"'{name}' is a required property", "validator": "required", "expected": list(self._required)}
+            for name in self.missing_required(arguments)
+        ][:MAX_ERRORS]
@@ -0,0 +1,306 @@
+"""服务端工具流水线（按依赖关系执行多个工具调用）
+
+流水线由若干步骤组成，每个步骤调用一个工具。参数中的字符串值如果以 ``$.`` 开头，
+会被解析为对前面步骤输出的引用（JSONPath 子集），例如 ``$.search.items[0].id``、
+``$.search.items[*].id``；在 ``for_each`` 步骤中，``$item`` 表示当前元素，例如 ``$item.id``。
+以 ``$$`` 开头的字符串表示字面量 ``$``；无法解析的引用在校验阶段直接报错，不会当作字面量传给工具。
+
+没有依赖关系的步骤并发执行，中间结果只保存在服务端，最终只返回 ``output`` 指定的投影。
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# 路径片段：.name / ['name'] / [0] / [*]
+_PATH_TOKEN = re.compile(r"\.([A-Za-z_][\w\-]*)|\[(\d+|\*|'[^']*'|\"[^\"]*\")\]")
+
+# $item 引用：$item / $item.x / $item[0]（$items 等不算引用）
+_ITEM_REFERENCE = re.compile(r"\$item(?=$|[.\[])")
+
+_WILDCARD = object()
+
+
+class PipelineError(ValueError):
+    """流水线定义或引用错误"""
+
+
+def parse_path(path: str) -> Tuple[str, List[Any]]:
+    """解析引用路径，返回 (根名称, 片段列表)
+
+    根名称为步骤 ID，或 ``$item`` 表示 for_each 的当前元素。
+    """
+    if _ITEM_REFERENCE.match(path):
+        root, rest = "$item", path[len("$item"):]
+    elif path.startswith("$."):
+        match = re.match(r"\$\.([A-Za-z_][\w\-]*)", path)
+        if not match:
+            raise PipelineError(f"无效的引用路径: {path}（字面量请以 $$ 开头）")
+        root, rest = match.group(1), path[match.end():]
+    else:
+        raise PipelineError(f"无效的引用路径: {path}")
+
+    tokens: List[Any] = []
+    position = 0
+    while position < len(rest):
+        match = _PATH_TOKEN.match(rest, position)
+        if not match:
+            raise PipelineError(
+                f"无效的引用路径: {path}（位置 {position + len(path) - len(rest)}，字面量请以 $$ 开头）"
+            )
+        name, bracket = match.groups()
+        if name is not None:
+            tokens.append(name)
+        elif bracket == "*":
+            tokens.append(_WILDCARD)
+        elif bracket[0] in "'\"":
+            tokens.append(bracket[1:-1])
+        else:
+            tokens.append(int(bracket))
+        position = match.end()
+    return root, tokens
+
+
+def resolve_path(value: Any, tokens: List[Any]) -> Any:
+    """按片段取值；包含 [*] 时返回列表"""
+    if not tokens:
+        return value
+    token, rest = tokens[0], tokens[1:]
+    if token is _WILDCARD:
+        if isinstance(value, dict):
+            items = list(value.values())
+        elif isinstance(value, list):
+            items = value
+        else:
+            raise PipelineError(f"[*] 只能用于数组或对象，实际类型: {type(value).__name__}")
+        results = []
+        for item in items:
+            resolved = resolve_path(item, rest)
+            # 多层通配符时展开为一维列表
+            if rest and _WILDCARD in rest and isinstance(resolved, list):
+                results.extend(resolved)
+            else:
+                results.append(resolved)
+        return results
+    if isinstance(token, int):
+        if not isinstance(value, list) or token >= len(value):
+            raise PipelineError(f"索引 [{token}] 超出范围")
+        return resolve_path(value[token], rest)
+    if not isinstance(value, dict) or token not in value:
+        raise PipelineError(f"字段 {token} 不存在")
+    return resolve_path(value[token], rest)
+
+
+def _is_reference(value: Any) -> bool:
+    return isinstance(value, str) and (value.startswith("$.") or _ITEM_REFERENCE.match(value) is not None)
+
+
+def _collect_references(value: Any, refs: Set[str]) -> None:
+    """收集参数中引用的步骤 ID（$item 引用记为 "$item"）"""
+    if _is_reference(value):
+        root, _ = parse_path(value)
+        refs.add(root)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_references(item, refs)
+    elif isinstance(value, list):
+        for item in value:
+            _collect_references(item, refs)
+
+
+def substitute(value: Any, outputs: Dict[str, Any], item: Any = None) -> Any:
+    """将参数中的引用替换为实际值"""
+    if isinstance(value, str):
+        if value.startswith("$$"):
+            return value[1:]
+        if _is_reference(value):
+            root, tokens = parse_path(value)
+            try:
+                return resolve_path(item if root == "$item" else outputs[root], tokens)
+            except PipelineError as e:
+                raise PipelineError(f"引用 {value} 无法解析: {e}") from None
+        return value
+    if isinstance(value, dict):
+        return {key: substitute(item_value, outputs, item) for key, item_value in value.items()}
+    if isinstance(value, list):
+        return [substitute(item_value, outputs, item) for item_value in value]
+    return value
+
+
+def parse_output(text: Any) -> Any:
+    """工具结果文本尽量解析为 JSON，便于后续步骤引用"""
+    if not isinstance(text, str):
+        return text
+    stripped = text.strip()
+    if stripped[:1] in ("{", "[", '"') or stripped in ("true", "false", "null"):
+        try:
+            return json.loads(stripped)
+        except ValueError:
+            pass
+    return text
+
+
+class ToolPipeline:
+    """工具流水线：校验步骤依赖并按 DAG 并发执行"""
+
+    def __init__(
+        self,
+        steps: List[Dict[str, Any]],
+        call: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        max_steps: int = 20,
+        max_fanout: int = 100,
+        concurrency: int = 8
+    ):
+        """
+        Args:
+            steps: 步骤定义列表
+            call: 执行单个工具的协程函数，返回 handle_execute_tool 格式的结果
+            max_steps: 最大步骤数
+            max_fanout: for_each 单步最大展开数量
+            concurrency: 整个流水线的最大并发调用数
+        """
+        self.steps = steps
+        self._call = call
+        self.max_fanout = max_fanout
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._dependencies: Dict[str, Set[str]] = {}
+        self._validate(max_steps)
+
+    def _validate(self, max_steps: int) -> None:
+        """校验步骤定义、依赖关系和环"""
+        if not isinstance(self.steps, list) or not self.steps:
+            raise PipelineError("steps 必须是非空数组")
+        if len(self.steps) > max_steps:
+            raise PipelineError(f"步骤数量 {len(self.steps)} 超过上限 {max_steps}")
+
+        for index, step in enumerate(self.steps):
+            if not isinstance(step, dict) or not step.get("tool_name"):
+                raise PipelineError(f"第 {index} 个步骤缺少 tool_name")
+            step_id = step.setdefault("id", f"step{index}")
+            if step_id in self._dependencies:
+                raise PipelineError(f"步骤 ID 重复: {step_id}")
+            depends_on = step.get("depends_on") or []
+            if isinstance(depends_on, str):
+                depends_on = [depends_on]
+            if not isinstance(depends_on, list) or not all(isinstance(dep, str) for dep in depends_on):
+                raise PipelineError(f"步骤 {step_id} 的 depends_on 必须是步骤 ID 或 ID 数组")
+            refs: Set[str] = set(depends_on)
+            try:
+                _collect_references(step.get("arguments") or {}, refs)
+            except PipelineError as e:
+                raise PipelineError(f"步骤 {step_id}: {e}") from None
+            if "$item" in refs:
+                refs.discard("$item")
+                if step.get("for_each") is None:
+                    raise PipelineError(f"步骤 {step_id} 没有 for_each，不能引用 $item（字面量请以 $$ 开头）")
+            if step.get("for_each") is not None:
+                if not _is_reference(step["for_each"]) or _ITEM_REFERENCE.match(step["for_each"]):
+                    raise PipelineError(f"步骤 {step_id} 的 for_each 必须引用前面步骤的输出")
+                _collect_references(step["for_each"], refs)
+            self._dependencies[step_id] = refs
+
+        for step_id, refs in self._dependencies.items():
+            unknown = refs - set(self._dependencies)
+            if unknown:
+                raise PipelineError(
+                    f"步骤 {step_id} 引用了不存在的步骤: {', '.join(sorted(unknown))}（字面量请以 $$ 开头）"
+                )
+
+        # 检测环
+        visiting: Set[str] = set()
+        visited: Set[str] = set()
+
+        def visit(step_id: str) -> None:
+            if step_id in visited:
+                return
+            if step_id in visiting:
+                raise PipelineError(f"步骤依赖存在环: {step_id}")
+            visiting.add(step_id)
+            for dependency in self._dependencies[step_id]:
+                visit(dependency)
+            visiting.discard(step_id)
+            visited.add(step_id)
+
+        for step_id in self._dependencies:
+            visit(step_id)
+
+    async def run(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """执行流水线，返回 (各步骤输出, 各步骤摘要)"""
+        outputs: Dict[str, Any] = {}
+        summaries: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_step(step: Dict[str, Any]) -> bool:
+            step_id = step["id"]
+            dependencies = self._dependencies[step_id]
+            if dependencies:
+                results = await asyncio.gather(*(tasks[dep] for dep in dependencies))
+                if not all(results):
+                    summaries[step_id] = {
+                        "id": step_id,
+                        "success": False,
+                        "skipped": True,
+                        "error": "依赖的步骤执行失败"
+                    }
+                    return False
+
+            started = time.perf_counter()
+            summary: Dict[str, Any] = {"id": step_id, "tool_name": step["tool_name"]}
+            try:
+                if step.get("for_each") is not None:
+                    items = substitute(step["for_each"], outputs)
+                    if not isinstance(items, list):
+                        items = [items]
+                    if len(items) > self.max_fanout:
+                        raise PipelineError(f"for_each 展开数量 {len(items)} 超过上限 {self.max_fanout}")
+                    results = await asyncio.gather(*(
+                        self._call_tool(step, outputs, item) for item in items
+                    ))
+                    summary["calls"] = len(items)
+                else:
+                    results = [await self._call_tool(step, outputs)]
+                    summary["calls"] = 1
+
+                errors = [result.get("error") for result in results if not result.get("success")]
+                if errors:
+                    summary.update(success=False, error=errors[0], failed_calls=len(errors))
+                    return False
+                values = [parse_output(result.get("result")) for result in results]
+                outputs[step_id] = values if step.get("for_each") is not None else values[0]
+                summary.update(success=True, error=None)
+                return True
+            except PipelineError as e:
+                summary.update(success=False, error=str(e))
+                return False
+            finally:
+                summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                summaries[step_id] = summary
+
+        for step in self.steps:
+            tasks[step["id"]] = asyncio.ensure_future(run_step(step))
+        await asyncio.gather(*tasks.values())
+
+        return outputs, [summaries[step["id"]] for step in self.steps]
+
+    async def _call_tool(self, step: Dict[str, Any], outputs: Dict[str, Any], item: Any = None) -> Dict[str, Any]:
+        """执行单次工具调用（受流水线并发限制）"""
+        arguments = substitute(step.get("arguments") or {}, outputs, item)
+        async with self._semaphore:
+            return await self._call(step["tool_name"], arguments)
+
+    @staticmethod
+    def project(outputs: Dict[str, Any], output: Optional[str], default_step: str) -> Any:
+        """计算最终返回的投影"""
+        if not output:
+            return outputs.get(default_step)
+        if not _is_reference(output) or _ITEM_REFERENCE.match(output):
+            raise PipelineError(f"output 必须引用步骤输出: {output}")
+        root, tokens = parse_path(output)
+        if root not in outputs:
+            raise PipelineError(f"output 引用的步骤没有输出: {root}")
+        try:
+            return resolve_path(outputs[root], tokens)
+        except PipelineError as e:
+            raise PipelineError(f"output {output} 无法解析: {e}") from None
@@ -0,0 +1,171 @@
+"""大结果暂存（分块返回 + 续读句柄）"""
+
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ..config.models import ToolProxyConfig
+
+
+class _StoredResult:
+    """暂存的结果"""
+
+    __slots__ = ("data", "expires_at", "line_count", "_line_offsets")
+
+    def __init__(self, data: bytes, expires_at: float):
+        self.data = data
+        self.expires_at = expires_at
+        # 行数直接统计换行符（末尾换行不算新的一行），行偏移只在首次按行读取时计算
+        self.line_count = data.count(b"\n") + (0 if data.endswith(b"\n") else 1)
+        self._line_offsets: Optional[List[int]] = None
+
+    @property
+    def line_offsets(self) -> List[int]:
+        """每一行的起始字节位置（按需计算）"""
+        if self._line_offsets is None:
+            offsets = [0]
+            offsets.extend(match.end() for match in re.finditer(b"\n", self.data))
+            if offsets[-1] == len(self.data) and len(offsets) > 1:
+                offsets.pop()
+            self._line_offsets = offsets
+        return self._line_offsets
+
+
+class ResultStore:
+    """在服务端暂存超大结果，首次只返回第一块，其余通过句柄分块读取"""
+
+    def __init__(self, config: ToolProxyConfig):
+        self.config = config
+        self._results: "OrderedDict[str, _StoredResult]" = OrderedDict()
+        self._total_bytes = 0
+
+    def needs_paging(self, text: str) -> bool:
+        """结果是否超过内联大小上限"""
+        limit = self.config.max_inline_result_bytes
+        if limit <= 0:
+            return False
+        # 先用字符数快速判断（UTF-8 每个字符至少 1 字节）
+        if len(text) > limit:
+            return True
+        return len(text.encode("utf-8")) > limit
+
+    def put(self, text: str) -> Dict[str, Any]:
+        """暂存结果，返回第一块内容和续读句柄"""
+        self._purge_expired()
+        data = text.encode("utf-8")
+        handle = uuid.uuid4().hex
+        self._results[handle] = _StoredResult(data, time.monotonic() + self.config.result_store_ttl)
+        self._total_bytes += len(data)
+        self._evict(keep=handle)
+        return self.fetch(handle, 0, self.config.max_inline_result_bytes, "bytes")
+
+    def fetch(
+        self,
+        handle: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        unit: str = "bytes"
+    ) -> Dict[str, Any]:
+        """按字节或行范围读取暂存的结果"""
+        stored = self._results.get(handle)
+        if stored is None or stored.expires_at <= time.monotonic():
+            if stored is not None:
+                self._remove(handle)
+            return {
+                "success": False,
+                "error": f"结果句柄不存在或已过期: {handle}",
+                "content": None
+            }
+        self._results.move_to_end(handle)
+
+        data = stored.data
+        total_bytes = len(data)
+        offset = max(int(offset or 0), 0)
+        if unit == "lines":
+            line_offsets = stored.line_offsets
+            total_lines = stored.line_count
+            length = int(length) if length else self.config.fetch_result_lines
+            end_line = min(offset + max(length, 1), total_lines)
+            start = line_offsets[offset] if offset < total_lines else total_bytes
+            end = line_offsets[end_line] if end_line < total_lines else total_bytes
+            next_offset = end_line if end_line < total_lines else None
+            next_unit = "lines"
+            # 按行读取同样受内联大小上限约束（如单行的压缩 JSON），超出时截断并改为字节偏移续读
+            limit = self.config.max_inline_result_bytes
+            if limit > 0 and end - start > limit:
+                end = self._char_boundary(data, start + limit)
+                if end <= start:
+                    end = self._char_boundary(data, min(start + 4, total_bytes))
+                next_offset = end if end < total_bytes else None
+                next_unit = "bytes"
+        elif unit == "bytes":
+            # 按字节读取同样不超过内联大小上限
+            limit = self.config.max_inline_result_bytes
+            length = int(length) if length else limit
+            if limit > 0:
+                length = min(length, limit)
+            start = self._char_boundary(data, min(offset, total_bytes))
+            end = self._char_boundary(data, min(start + max(length, 1), total_bytes))
+            if end <= start < total_bytes:
+                # 长度不足一个字符时至少返回一个完整字符
+                end = self._char_boundary(data, min(start + 4, total_bytes))
+            next_offset = end if end < total_bytes else None
+            next_unit = "bytes"
+        else:
+            return {
+                "success": False,
+                "error": f"不支持的单位: {unit}（可选 bytes / lines）",
+                "content": None
+            }
+
+        return {
+            "success": True,
+            "error": None,
+            "content": data[start:end].decode("utf-8", errors="replace"),
+            "result_handle": handle,
+            "unit": unit,
+            "offset": offset,
+            "next_offset": next_offset,
+            "next_unit": next_unit,  # next_offset 的单位（按行读取被截断时为 bytes）
+            "has_more": next_offset is not None,
+            "total_bytes": total_bytes,
+            "total_lines": stored.line_count
+        }
+
+    @staticmethod
+    def _char_boundary(data: bytes, position: int) -> int:
+        """向前调整到 UTF-8 字符边界"""
+        while 0 < position < len(data) and (data[position] & 0xC0) == 0x80:
+            position -= 1
+        return position
+
+    def _purge_expired(self) -> None:
+        """清理过期结果"""
+        now = time.monotonic()
+        for handle in [h for h, stored in self._results.items() if stored.expires_at <= now]:
+            self._remove(handle)
+
+    def _evict(self, keep: str) -> None:
+        """按 LRU 淘汰，直到满足数量和总大小限制"""
+        while len(self._results) > 1 and (
+            len(self._results) > max(1, self.config.result_store_max_entries)
+            or self._total_bytes > self.config.result_store_max_bytes
+        ):
+            handle = next(iter(self._results))
+            if handle == keep:
+                break
+            self._remove(handle)
+
+    def _remove(self, handle: str) -> None:
+        stored = self._results.pop(handle, None)
+        if stored is not None:
+            self._total_bytes -= len(stored.data)
+
+    def stats(self) -> Dict[str, Any]:
+        """获取暂存统计"""
+        return {
+            "entries": len(self._results),
+            "total_bytes": self._total_bytes
+        }
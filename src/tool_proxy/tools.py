@@ -1,13 +1,18 @@
 """工具代理工具定义"""
 
+import asyncio
 import json
 import logging
-from typing import Any, Dict, List
+import time
+from typing import Any, Dict, List, Optional
 from mcp.types import Tool
 
-from ..tool_index.manager import ToolIndexManager
+from ..tool_index.manager import AmbiguousToolError, ToolIndexManager
+from ..tool_index.models import DETAIL_LEVELS
 from ..mcp_client.manager import McpClientManager
 from ..config.models import Config
+from .pipeline import PipelineError, ToolPipeline
+from .result_store import ResultStore
 
 logger = logging.getLogger(__name__)
 
@@ -25,10 +30,26 @@ def create_proxy_tools(
     if proxy_config.enable_search:
         tools.append(_create_search_tool(tool_index_manager, proxy_config))
     
+    # 工具详情工具
+    if proxy_config.enable_describe:
+        tools.append(_create_describe_tool(proxy_config))
+    
     # 执行工具
     if proxy_config.enable_execute:
         tools.append(_create_execute_tool(tool_index_manager, mcp_client_manager, config))
     
+    # 批量执行工具
+    if proxy_config.enable_execute_batch:
+        tools.append(_create_execute_batch_tool(proxy_config))
+    
+    # 流水线工具
+    if proxy_config.enable_pipeline:
+        tools.append(_create_pipeline_tool(proxy_config))
+    
+    # 大结果分块读取工具
+    if proxy_config.enable_fetch_result:
+        tools.append(_create_fetch_result_tool(proxy_config))
+    
     # 服务列表工具
     if proxy_config.enable_list_services:
         tools.append(_create_list_services_tool(tool_index_manager, mcp_client_manager))
@@ -40,13 +61,23 @@ def _create_search_tool(tool_index_manager: ToolIndexManager, proxy_config) -> T
     """创建搜索工具"""
     return Tool(
         name="mcp_search_tools",
-        description="搜索可用的 MCP 工具。通过关键词搜索工具名称、描述、参数等信息。",
+        description=(
+            "搜索可用的 MCP 工具。通过关键词搜索工具名称、描述、参数等信息。"
+            "默认只返回工具名称和一行描述，需要参数时使用 mcp_describe_tool 查询选中工具的完整 schema。"
+            "结果中的 facets 为各服务的命中数量，可用 service_name 缩小范围。"
+        ),
         inputSchema={
             "type": "object",
             "properties": {
                 "query": {
                     "type": "string",
-                    "description": "搜索关键词，支持模糊匹配工具名称、描述、参数等"
+                    "description": "搜索关键词，支持模糊匹配工具名称、描述、参数等；prefix 模式下为名称前缀"
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["text", "prefix"],
+                    "description": "搜索方式：text 全文搜索；prefix 列出名称以 query 开头的工具（如服务前缀 gh_），默认 text",
+                    "default": "text"
                 },
                 "service_name": {
                     "type": "string",
@@ -56,6 +87,15 @@ def _create_search_tool(tool_index_manager: ToolIndexManager, proxy_config) -> T
                     "type": "number",
                     "description": f"返回结果数量限制，默认 {proxy_config.search_limit}",
                     "default": proxy_config.search_limit
+                },
+                "detail": {
+                    "type": "string",
+                    "enum": list(DETAIL_LEVELS),
+                    "description": (
+                        "结果详细程度：compact 只返回名称和一行描述，params 额外返回参数定义，"
+                        f"full 返回完整输入 schema，默认 {proxy_config.search_detail}"
+                    ),
+                    "default": proxy_config.search_detail
                 }
             },
             "required": ["query"]
@@ -63,6 +103,25 @@ def _create_search_tool(tool_index_manager: ToolIndexManager, proxy_config) -> T
     )
 
 
+def _create_describe_tool(proxy_config) -> Tool:
+    """创建工具详情工具"""
+    return Tool(
+        name="mcp_describe_tool",
+        description="查询一个或多个工具的完整描述和输入参数 schema，用于在执行前确认参数格式。",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "tool_names": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": f"工具名称列表（显示名称或原始名称），最多 {proxy_config.describe_max_tools} 个"
+                }
+            },
+            "required": ["tool_names"]
+        }
+    )
+
+
 def _create_execute_tool(
     tool_index_manager: ToolIndexManager,
     mcp_client_manager: McpClientManager,
@@ -82,6 +141,10 @@ def _create_execute_tool(
                 "arguments": {
                     "type": "object",
                     "description": "工具参数，JSON 对象格式"
+                },
+                "timeout": {
+                    "type": "number",
+                    "description": "可选：本次调用的超时时间（秒），超时后取消请求"
                 }
             },
             "required": ["tool_name", "arguments"]
@@ -89,6 +152,138 @@ def _create_execute_tool(
     )
 
 
+def _create_execute_batch_tool(proxy_config) -> Tool:
+    """创建批量执行工具"""
+    return Tool(
+        name="mcp_execute_batch",
+        description=(
+            "并发执行多个相互独立的 MCP 工具调用，按输入顺序返回每个调用的结果、错误和耗时。"
+            "适用于需要多次独立查询的场景，可替代多次 mcp_execute_tool 调用。"
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "calls": {
+                    "type": "array",
+                    "description": f"工具调用列表，最多 {proxy_config.batch_max_calls} 个",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "tool_name": {
+                                "type": "string",
+                                "description": "要执行的工具名称（可以是显示名称或原始名称）"
+                            },
+                            "arguments": {
+                                "type": "object",
+                                "description": "工具参数，JSON 对象格式"
+                            },
+                            "timeout": {
+                                "type": "number",
+                                "description": "可选：该调用的超时时间（秒）"
+                            }
+                        },
+                        "required": ["tool_name"]
+                    }
+                }
+            },
+            "required": ["calls"]
+        }
+    )
+
+
+def _create_pipeline_tool(proxy_config) -> Tool:
+    """创建流水线工具"""
+    return Tool(
+        name="mcp_execute_pipeline",
+        description=(
+            "在服务端按依赖关系执行一组工具调用，中间结果不返回，只返回最终投影。"
+            "参数值以 \"$.<步骤ID>\" 开头时引用前面步骤的输出（JSONPath 子集，如 $.search.items[0].id、"
+            "$.search.items[*].id）；for_each 步骤对引用得到的数组逐项执行，用 \"$item\" 引用当前元素"
+            "（如 $item.id）。以 $ 开头的字面量写成 $$（如 \"$$.5\"）。互不依赖的步骤会并发执行。"
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "steps": {
+                    "type": "array",
+                    "description": f"步骤列表，最多 {proxy_config.pipeline_max_steps} 个",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {
+                                "type": "string",
+                                "description": "步骤 ID，供后续步骤引用，默认 step<序号>"
+                            },
+                            "tool_name": {
+                                "type": "string",
+                                "description": "要执行的工具名称"
+                            },
+                            "arguments": {
+                                "type": "object",
+                                "description": "工具参数，可包含 $.<步骤ID>... 或 $item... 引用"
+                            },
+                            "for_each": {
+                                "type": "string",
+                                "description": f"可选：引用一个数组，对每个元素执行一次（最多 {proxy_config.pipeline_max_fanout} 次）"
+                            },
+                            "depends_on": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "可选：显式声明依赖的步骤 ID（也可以是单个 ID 字符串）"
+                            }
+                        },
+                        "required": ["tool_name"]
+                    }
+                },
+                "output": {
+                    "type": "string",
+                    "description": "可选：最终返回的投影，如 $.details[*].title，默认返回最后一个步骤的输出"
+                }
+            },
+            "required": ["steps"]
+        }
+    )
+
+
+def _create_fetch_result_tool(proxy_config) -> Tool:
+    """创建大结果分块读取工具"""
+    return Tool(
+        name="mcp_fetch_result",
+        description=(
+            "分块读取暂存在服务端的大结果。当工具执行结果超过大小上限时，"
+            "mcp_execute_tool 只返回第一块内容和 result_handle，使用本工具按字节或行范围读取剩余内容。"
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "result_handle": {
+                    "type": "string",
+                    "description": "mcp_execute_tool 返回的结果句柄"
+                },
+                "offset": {
+                    "type": "number",
+                    "description": "起始位置（字节偏移或行号，从 0 开始），通常使用上次返回的 next_offset，并以 next_unit 作为 unit",
+                    "default": 0
+                },
+                "length": {
+                    "type": "number",
+                    "description": (
+                        f"读取长度，默认 {proxy_config.max_inline_result_bytes} 字节"
+                        f"或 {proxy_config.fetch_result_lines} 行（单次最多 {proxy_config.max_inline_result_bytes} 字节）"
+                    )
+                },
+                "unit": {
+                    "type": "string",
+                    "enum": ["bytes", "lines"],
+                    "description": "offset 和 length 的单位，默认 bytes",
+                    "default": "bytes"
+                }
+            },
+            "required": ["result_handle"]
+        }
+    )
+
+
 def _create_list_services_tool(
     tool_index_manager: ToolIndexManager,
     mcp_client_manager: McpClientManager
@@ -109,18 +304,81 @@ async def handle_search_tools(
     tool_index_manager: ToolIndexManager,
     query: str,
     service_name: str = None,
-    limit: int = 20
+    limit: int = 20,
+    detail: str = "compact",
+    mode: str = "text"
 ) -> List[Dict[str, Any]]:
-    """处理工具搜索"""
-    results = tool_index_manager.search(query, service_name, limit)
+    """处理工具搜索（detail 控制每个结果的详细程度，mode 为 prefix 时按名称前缀补全）"""
+    if detail not in DETAIL_LEVELS:
+        detail = "compact"
+    facets = None
+    if mode == "prefix":
+        results = tool_index_manager.complete(query, service_name, limit)
+    else:
+        mode = "text"
+        results, facets = tool_index_manager.search_faceted(query, service_name, limit)
     
-    return {
-        "tools": [tool.to_dict() for tool in results],
+    response = {
+        "tools": [tool.to_dict(detail) for tool in results],
         "total": len(results),
         "limit": limit,
         "query": query,
+        "mode": mode,
         "service_name": service_name
     }
+    if facets is not None:
+        # 各服务的命中数量（按数量降序），可用 service_name 参数进一步筛选
+        response["facets"] = dict(sorted(facets.items(), key=lambda item: (-item[1], item[0])))
+        response["total_matches"] = sum(facets.values())
+    return response
+
+
+async def handle_describe_tool(
+    tool_index_manager: ToolIndexManager,
+    tool_names: List[str],
+    max_tools: int = 10
+) -> Dict[str, Any]:
+    """处理工具详情查询（返回完整输入 schema）"""
+    if isinstance(tool_names, str):
+        tool_names = [tool_names]
+    if not isinstance(tool_names, list) or not tool_names:
+        return {
+            "success": False,
+            "error": "tool_names 必须是非空数组",
+            "tools": []
+        }
+    if len(tool_names) > max_tools:
+        return {
+            "success": False,
+            "error": f"工具数量 {len(tool_names)} 超过上限 {max_tools}",
+            "tools": []
+        }
+    
+    tools = []
+    errors = []
+    for tool_name in tool_names:
+        try:
+            tool_index = tool_index_manager.get_tool(tool_name)
+        except AmbiguousToolError as e:
+            errors.append({"tool_name": tool_name, "error": str(e), "candidates": e.candidates})
+            continue
+        if not tool_index:
+            errors.append({"tool_name": tool_name, "error": f"工具不存在: {tool_name}"})
+            continue
+        tools.append({
+            "name": tool_index.display_name,
+            "service": tool_index.service_name,
+            "description": tool_index.description,
+            "input_schema": tool_index.input_schema
+        })
+    
+    response: Dict[str, Any] = {
+        "success": not errors,
+        "tools": tools
+    }
+    if errors:
+        response["errors"] = errors
+    return response
 
 
 async def handle_execute_tool(
@@ -129,11 +387,25 @@ async def handle_execute_tool(
     config: Config,
     tool_name: str,
     arguments: Dict[str, Any],
-    command_manager = None
+    command_manager = None,
+    timeout: Optional[float] = None,
+    result_store: Optional[ResultStore] = None
 ) -> Dict[str, Any]:
-    """处理工具执行"""
+    """处理工具执行
+
+    timeout 为调用方指定的超时时间（秒）；提供 result_store 时，超过内联大小上限的结果
+    暂存在服务端，只返回第一块内容和续读句柄。
+    """
     # 查找工具索引
-    tool_index = tool_index_manager.get_tool(tool_name)
+    try:
+        tool_index = tool_index_manager.get_tool(tool_name)
+    except AmbiguousToolError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "candidates": e.candidates,
+            "result": None
+        }
     if not tool_index:
         return {
             "success": False,
@@ -141,20 +413,34 @@ async def handle_execute_tool(
             "result": None
         }
     
-    # 验证参数
-    required_params = [
-        name for name, info in tool_index.parameters.items()
-        if info.get("required", False)
-    ]
-    
-    missing_params = [param for param in required_params if param not in arguments]
-    if missing_params:
+    # 校验参数（使用索引时编译的校验器，失败时不请求上游服务）
+    proxy_config = config.global_config.tool_proxy
+    validator = tool_index.validator
+    if proxy_config.validate_arguments:
+        if proxy_config.coerce_arguments and isinstance(arguments, dict):
+            arguments = validator.coerce(arguments)
+        validation_errors = validator.validate(arguments)
+    else:
+        validation_errors = validator.required_errors(arguments)
+    if validation_errors:
+        # 缺少必需参数与其他校验错误使用相同的结构，error 只是摘要
+        missing_params = validator.missing_required(arguments) if isinstance(arguments, dict) else []
+        if missing_params:
+            error = f"缺少必需参数: {', '.join(missing_params)}"
+        else:
+            first = validation_errors[0]
+            error = f"参数校验失败: {first['path'] + ': ' if first['path'] else ''}{first['message']}"
         return {
             "success": False,
-            "error": f"缺少必需参数: {', '.join(missing_params)}",
-            "result": None
+            "error": error,
+            "validation_errors": validation_errors,
+            "result": None,
+            "tool_name": tool_index.display_name,
+            "service": tool_index.service_name
         }
     
+    deadline = time.monotonic() + float(timeout) if timeout else None
+    
     try:
         # 如果是本地命令，使用 command_manager 执行
         if tool_index.service_name == "local":
@@ -164,7 +450,16 @@ async def handle_execute_tool(
                     "error": "命令管理器未初始化",
                     "result": None
                 }
-            result = await command_manager.call_tool(tool_index.name, arguments)
+            if deadline is None:
+                result = await command_manager.call_tool(tool_index.name, arguments)
+            else:
+                try:
+                    result = await asyncio.wait_for(
+                        command_manager.call_tool(tool_index.name, arguments),
+                        float(timeout)
+                    )
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"调用工具 {tool_index.name} 超时（{float(timeout):.1f} 秒）")
             # 转换结果格式
             contents = []
             for content in result:
@@ -179,7 +474,8 @@ async def handle_execute_tool(
             result = await mcp_client_manager.call_tool(
                 tool_index.service_name,
                 tool_index.name,  # 使用原始名称
-                arguments
+                arguments,
+                deadline=deadline
             )
             
             logger.debug(f"MCP 工具返回结果类型: {type(result)}, 是否有 content 属性: {hasattr(result, 'content')}")
@@ -224,6 +520,25 @@ async def handle_execute_tool(
                     logger.warning(f"工具 {tool_name} 返回了空结果，使用默认空 JSON 对象")
                     result_text = "{}"  # 返回空 JSON 对象而不是空字符串
         
+        # 超大结果：暂存在服务端，只返回第一块
+        if result_store is not None and result_store.needs_paging(result_text):
+            page = result_store.put(result_text)
+            logger.debug(f"工具 {tool_name} 结果过大 ({page['total_bytes']} 字节)，已暂存: {page['result_handle']}")
+            tool_index_manager.record_usage(tool_index.display_name, True)
+            return {
+                "success": True,
+                "error": None,
+                "result": page["content"],
+                "truncated": True,
+                "result_handle": page["result_handle"],
+                "next_offset": page["next_offset"],
+                "total_bytes": page["total_bytes"],
+                "total_lines": page["total_lines"],
+                "tool_name": tool_index.display_name,
+                "service": tool_index.service_name
+            }
+        
+        tool_index_manager.record_usage(tool_index.display_name, True)
         return {
             "success": True,
             "error": None,
@@ -235,6 +550,7 @@ async def handle_execute_tool(
     except Exception as e:
         error_msg = str(e)
         logger.error(f"执行工具 {tool_name} 失败: {error_msg}", exc_info=True)
+        tool_index_manager.record_usage(tool_index.display_name, False)
         
         # 尝试从异常中提取更多信息
         error_details = {
@@ -258,9 +574,179 @@ async def handle_execute_tool(
         }
 
 
+async def handle_execute_batch(
+    tool_index_manager: ToolIndexManager,
+    mcp_client_manager: McpClientManager,
+    config: Config,
+    calls: List[Dict[str, Any]],
+    command_manager = None,
+    result_store: Optional[ResultStore] = None
+) -> Dict[str, Any]:
+    """处理批量工具执行（跨服务并发，单服务限流）"""
+    proxy_config = config.global_config.tool_proxy
+    if not isinstance(calls, list) or not calls:
+        return {
+            "success": False,
+            "error": "calls 必须是非空数组",
+            "results": []
+        }
+    if len(calls) > proxy_config.batch_max_calls:
+        return {
+            "success": False,
+            "error": f"批量调用数量 {len(calls)} 超过上限 {proxy_config.batch_max_calls}",
+            "results": []
+        }
+    
+    # 每个服务一个信号量，避免批量请求压垮单个服务
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    
+    async def run_call(index: int, call: Any) -> Dict[str, Any]:
+        started = time.perf_counter()
+        tool_name = call.get("tool_name") if isinstance(call, dict) else None
+        try:
+            if not tool_name:
+                result = {
+                    "success": False,
+                    "error": "缺少 tool_name",
+                    "result": None
+                }
+            else:
+                try:
+                    tool_index = tool_index_manager.get_tool(tool_name)
+                except AmbiguousToolError:
+                    # 由 handle_execute_tool 返回消歧错误
+                    tool_index = None
+                service_name = tool_index.service_name if tool_index else ""
+                semaphore = semaphores.get(service_name)
+                if semaphore is None:
+                    semaphore = asyncio.Semaphore(max(1, proxy_config.batch_concurrency_per_service))
+                    semaphores[service_name] = semaphore
+                async with semaphore:
+                    result = await handle_execute_tool(
+                        tool_index_manager,
+                        mcp_client_manager,
+                        config,
+                        tool_name,
+                        call.get("arguments") or {},
+                        command_manager=command_manager,
+                        timeout=call.get("timeout"),
+                        result_store=result_store
+                    )
+        except Exception as e:
+            logger.error(f"批量执行第 {index} 个调用 {tool_name} 失败: {e}", exc_info=True)
+            result = {
+                "success": False,
+                "error": str(e),
+                "result": None
+            }
+        result["index"] = index
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run_call(i, call) for i, call in enumerate(calls)))
+    succeeded = sum(1 for result in results if result.get("success"))
+    
+    return {
+        "success": succeeded == len(results),
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+async def handle_execute_pipeline(
+    tool_index_manager: ToolIndexManager,
+    mcp_client_manager: McpClientManager,
+    config: Config,
+    steps: List[Dict[str, Any]],
+    output: Optional[str] = None,
+    command_manager = None,
+    result_store: Optional[ResultStore] = None
+) -> Dict[str, Any]:
+    """处理流水线执行（中间结果只保存在服务端）"""
+    proxy_config = config.global_config.tool_proxy
+    
+    async def call(tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        # 中间结果不分块，保证后续步骤拿到完整输出
+        return await handle_execute_tool(
+            tool_index_manager,
+            mcp_client_manager,
+            config,
+            tool_name,
+            arguments,
+            command_manager=command_manager
+        )
+    
+    started = time.perf_counter()
+    try:
+        pipeline = ToolPipeline(
+            steps,
+            call,
+            max_steps=proxy_config.pipeline_max_steps,
+            max_fanout=proxy_config.pipeline_max_fanout,
+            concurrency=proxy_config.pipeline_concurrency
+        )
+        outputs, summaries = await pipeline.run()
+        success = all(summary.get("success") for summary in summaries)
+        result = ToolPipeline.project(outputs, output, steps[-1]["id"]) if success else None
+    except PipelineError as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "result": None
+        }
+    
+    response: Dict[str, Any] = {
+        "success": success,
+        "error": None if success else next(
+            f"步骤 {summary['id']} 失败: {summary.get('error')}"
+            for summary in summaries if not summary.get("success")
+        ),
+        "result": result,
+        "steps": summaries,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+    
+    # 最终结果过大时同样暂存在服务端
+    if result is not None and result_store is not None:
+        result_text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        if result_store.needs_paging(result_text):
+            page = result_store.put(result_text)
+            response.update(
+                result=page["content"],
+                truncated=True,
+                result_handle=page["result_handle"],
+                next_offset=page["next_offset"],
+                total_bytes=page["total_bytes"],
+                total_lines=page["total_lines"]
+            )
+    return response
+
+
+async def handle_fetch_result(
+    result_store: ResultStore,
+    result_handle: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    unit: str = "bytes"
+) -> Dict[str, Any]:
+    """处理大结果分块读取"""
+    if not result_handle:
+        return {
+            "success": False,
+            "error": "缺少 result_handle",
+            "content": None
+        }
+    return result_store.fetch(result_handle, offset, length, unit)
+
+
 async def handle_list_services(
     tool_index_manager: ToolIndexManager,
-    mcp_client_manager: McpClientManager
+    mcp_client_manager: McpClientManager,
+    command_manager = None
 ) -> Dict[str, Any]:
     """处理服务列表"""
     services = []
@@ -270,16 +756,27 @@ async def handle_list_services(
     for service_name in all_services:
         tools = tool_index_manager.get_service_tools(service_name)
         status = connection_status.get(service_name, "unknown")
+        if service_name == "local":
+            stats = command_manager.get_service_stats() if command_manager else {}
+        else:
+            stats = mcp_client_manager.get_service_stats(service_name)
         
-        services.append({
+        service_info = {
             "name": service_name,
             "description": tools[0].service_description if tools else "",
             "status": status,
             "tool_count": len(tools)
-        })
+        }
+        if mcp_client_manager.is_service_stale(service_name):
+            # 工具列表来自快照，服务尚未完成连接
+            service_info["stale"] = True
+        if stats:
+            service_info["stats"] = stats
+        services.append(service_info)
     
     return {
         "services": services,
-        "total": len(services)
+        "total": len(services),
+        "search_cache": tool_index_manager.get_search_cache_stats()
     }
 
@@ -0,0 +1,83 @@
+"""工具调用结果缓存（TTL + LRU）"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..config.models import ResultCacheConfig
+
+
+def make_call_key(service_name: str, tool_name: str, arguments: Optional[Dict[str, Any]]) -> str:
+    """生成调用的规范化键（参数顺序无关）"""
+    payload = json.dumps(
+        [service_name, tool_name, arguments or {}],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """带过期时间的 LRU 结果缓存"""
+
+    def __init__(self, config: ResultCacheConfig):
+        self.config = config
+        # {key: (过期时间, 结果)}，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_ttl(self, tool_name: str) -> float:
+        """获取工具的缓存时间（秒），0 表示不缓存"""
+        if self.config.tools is not None and tool_name not in self.config.tools:
+            return 0
+        return self.config.tool_ttl.get(tool_name, self.config.ttl)
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        """工具结果是否可以缓存"""
+        return self.get_ttl(tool_name) > 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """读取缓存，返回 (是否命中, 结果)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return True, value
+            del self._entries[key]
+        self._misses += 1
+        return False, None
+
+    def set(self, key: str, tool_name: str, value: Any) -> None:
+        """写入缓存"""
+        ttl = self.get_ttl(tool_name)
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > max(1, self.config.max_entries):
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / total, 4) if total else 0.0,
+            "evictions": self._evictions,
+            "size": len(self._entries),
+            "max_entries": self.config.max_entries
+        }
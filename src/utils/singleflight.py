@@ -0,0 +1,47 @@
+"""相同并发调用合并（single-flight）"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """合并相同键的并发调用：同一时刻每个键只执行一次，其余调用共享结果"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """执行调用；如果相同键的调用正在进行中，则等待其结果"""
+        task, _ = self.join(key, fn)
+        # 单个调用方被取消时不影响其他共享该结果的调用方
+        return await asyncio.shield(task)
+
+    def join(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[asyncio.Task, bool]:
+        """加入调用，返回共享的任务和当前调用方是否为发起方（调用方自行等待，等待超时不会取消任务）"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            return task, False
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self._executed += 1
+        task.add_done_callback(lambda t: self._on_done(key, t))
+        return task, True
+
+    def _on_done(self, key: str, task: asyncio.Task) -> None:
+        """调用完成后移除记录"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 标记异常已读取，避免所有调用方都被取消时产生告警
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """获取合并统计"""
+        return {
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._inflight)
+        }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""工具流水线（ToolPipeline）测试"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径（src 内使用相对导入）
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.tool_proxy.pipeline import PipelineError, ToolPipeline
+
+
+class FakeTools:
+    """记录调用并返回预设结果的工具"""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, tool_name, arguments):
+        self.calls.append((tool_name, arguments))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        result = self.results[tool_name]
+        if callable(result):
+            result = result(arguments)
+        return {"success": True, "error": None, "result": json.dumps(result)}
+
+
+def expect_error(steps, text):
+    try:
+        ToolPipeline(steps, FakeTools({}))
+    except PipelineError as e:
+        assert text in str(e), str(e)
+    else:
+        raise AssertionError(f"未报错: {steps}")
+
+
+def test_cycle():
+    """依赖环在执行前报错"""
+    expect_error([
+        {"id": "a", "tool_name": "t", "arguments": {"x": "$.b.v"}},
+        {"id": "b", "tool_name": "t", "depends_on": ["a"]}
+    ], "存在环")
+    expect_error([{"id": "a", "tool_name": "t", "depends_on": "a"}], "存在环")
+
+
+def test_fan_out():
+    """for_each 逐项执行，无依赖的步骤并发执行"""
+    tools = FakeTools({
+        "search": {"items": [{"id": 1}, {"id": 2}, {"id": 3}]},
+        "detail": lambda arguments: {"title": f"t{arguments['id']}"},
+        "other": "ok"
+    })
+    pipeline = ToolPipeline([
+        {"id": "search", "tool_name": "search"},
+        {"id": "side", "tool_name": "other"},
+        {"id": "details", "tool_name": "detail", "for_each": "$.search.items[*]", "arguments": {"id": "$item.id"}}
+    ], tools)
+    outputs, summaries = asyncio.run(pipeline.run())
+    assert ToolPipeline.project(outputs, "$.details[*].title", "details") == ["t1", "t2", "t3"]
+    assert [summary["calls"] for summary in summaries] == [1, 1, 3]
+    assert tools.max_running >= 3
+
+
+def test_fan_out_limit():
+    """for_each 展开数量超过上限时步骤失败"""
+    tools = FakeTools({"list": list(range(5)), "one": "ok"})
+    pipeline = ToolPipeline([
+        {"id": "list", "tool_name": "list"},
+        {"id": "each", "tool_name": "one", "for_each": "$.list", "arguments": {"n": "$item"}}
+    ], tools, max_fanout=3)
+    _, summaries = asyncio.run(pipeline.run())
+    assert not summaries[1]["success"]
+    assert "超过上限" in summaries[1]["error"]
+    assert len(tools.calls) == 1
+
+
+def test_string_depends_on():
+    """depends_on 为字符串时视为单个步骤 ID"""
+    tools = FakeTools({"fetch": "a", "parse": "b"})
+    pipeline = ToolPipeline([
+        {"id": "fetch", "tool_name": "fetch"},
+        {"id": "parse", "tool_name": "parse", "depends_on": "fetch"}
+    ], tools)
+    _, summaries = asyncio.run(pipeline.run())
+    assert all(summary["success"] for summary in summaries)
+    expect_error([{"id": "a", "tool_name": "t", "depends_on": {"b": 1}}], "depends_on")
+
+
+def test_unresolved_references():
+    """无法解析的引用在校验阶段报错，$$ 表示字面量"""
+    expect_error([{"id": "a", "tool_name": "t", "arguments": {"price": "$.5 off"}}], "字面量请以 $$ 开头")
+    expect_error([{"id": "a", "tool_name": "t", "arguments": {"q": "$.missing"}}], "不存在的步骤: missing")
+    expect_error([{"id": "a", "tool_name": "t", "arguments": {"q": "$item.id"}}], "不能引用 $item")
+
+    tools = FakeTools({"t": "ok"})
+    pipeline = ToolPipeline([
+        {"id": "a", "tool_name": "t", "arguments": {"price": "$$.5 off", "name": "$items"}}
+    ], tools)
+    asyncio.run(pipeline.run())
+    assert tools.calls == [("t", {"price": "$.5 off", "name": "$items"})]
+
+
+def test_runtime_lookup_error():
+    """引用的字段不存在时错误信息包含引用本身"""
+    tools = FakeTools({"a": {"x": 1}, "b": "ok"})
+    pipeline = ToolPipeline([
+        {"id": "a", "tool_name": "a"},
+        {"id": "b", "tool_name": "b", "arguments": {"v": "$.a.y"}}
+    ], tools)
+    _, summaries = asyncio.run(pipeline.run())
+    assert summaries[1]["error"] == "引用 $.a.y 无法解析: 字段 y 不存在"
+
+
+def main() -> int:
+    """主测试函数"""
+    tests = [
+        test_cycle,
+        test_fan_out,
+        test_fan_out_limit,
+        test_string_depends_on,
+        test_unresolved_references,
+        test_runtime_lookup_error,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
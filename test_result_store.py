@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""大结果暂存（ResultStore）测试"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径（src 内使用相对导入）
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config.models import ToolProxyConfig
+from src.tool_proxy.result_store import ResultStore
+
+
+def make_store(limit: int = 10, lines: int = 2) -> ResultStore:
+    return ResultStore(ToolProxyConfig(max_inline_result_bytes=limit, fetch_result_lines=lines))
+
+
+def read_all(store: ResultStore, handle: str, length: int) -> str:
+    """按字节依次读取全部内容"""
+    parts = []
+    offset = 0
+    while offset is not None:
+        chunk = store.fetch(handle, offset, length, "bytes")
+        assert chunk["success"], chunk
+        parts.append(chunk["content"])
+        offset = chunk["next_offset"]
+    return "".join(parts)
+
+
+def test_multibyte_boundary():
+    """分块不会切断多字节字符"""
+    store = make_store(limit=10)
+    text = "中文字符" * 5  # 每个字符 3 字节
+    first = store.put(text)
+    assert first["content"] == "中文字"  # 10 字节向前调整到 9 字节
+    assert first["next_offset"] == 9
+    assert "�" not in first["content"]
+
+    # 从字符中间开始读取时向前调整到字符边界
+    middle = store.fetch(first["result_handle"], 10, 6, "bytes")
+    assert middle["content"] == "符中"
+
+    # 长度不足一个字符时至少返回一个完整字符
+    single = store.fetch(first["result_handle"], 0, 1, "bytes")
+    assert single["content"] == "中"
+    assert single["next_offset"] == 3
+
+    assert read_all(store, first["result_handle"], 7) == text
+
+
+def test_oversized_length_is_capped():
+    """调用方指定的长度不超过内联大小上限"""
+    store = make_store(limit=10)
+    handle = store.put("a" * 100)["result_handle"]
+    chunk = store.fetch(handle, 0, 50_000_000, "bytes")
+    assert chunk["content"] == "a" * 10
+    assert chunk["next_offset"] == 10
+    assert chunk["has_more"]
+
+
+def test_line_mode_capped_by_bytes():
+    """按行读取超过上限时截断，并改为字节偏移续读"""
+    store = make_store(limit=10, lines=2)
+    handle = store.put("short\n" + "x" * 30 + "\nend")["result_handle"]
+    first = store.fetch(handle, 0, None, "lines")
+    assert first["content"] == "short\nxxxx"
+    assert first["next_unit"] == "bytes"
+    assert first["next_offset"] == 10
+    assert first["total_lines"] == 3
+
+    last = store.fetch(handle, 2, None, "lines")
+    assert last["content"] == "end"
+    assert last["next_offset"] is None
+
+
+def test_line_count_without_offsets():
+    """按字节读取不计算行偏移"""
+    store = make_store(limit=10)
+    first = store.put("line\n" * 10)
+    assert first["total_lines"] == 10
+    assert store._results[first["result_handle"]]._line_offsets is None
+
+
+def test_expired_handle():
+    """未知句柄返回错误"""
+    store = make_store()
+    result = store.fetch("missing")
+    assert not result["success"]
+    assert result["content"] is None
+
+
+def main() -> int:
+    """主测试函数"""
+    tests = [
+        test_multibyte_boundary,
+        test_oversized_length_is_capped,
+        test_line_mode_capped_by_bytes,
+        test_line_count_without_offsets,
+        test_expired_handle,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""并发调用合并（SingleFlight）测试"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径（src 内使用相对导入）
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.utils.singleflight import SingleFlight
+
+
+class SlowCall:
+    """记录执行次数，等待放行后返回结果"""
+
+    def __init__(self, result="ok"):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_coalesce():
+    """相同键的并发调用只执行一次"""
+    async def run():
+        flight = SingleFlight()
+        call = SlowCall()
+        waiters = [asyncio.ensure_future(flight.do("k", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert flight.stats() == {"executed": 1, "coalesced": 2, "in_flight": 1}
+        call.release.set()
+        assert await asyncio.gather(*waiters) == ["ok"] * 3
+        assert call.calls == 1
+        assert flight.stats()["in_flight"] == 0
+
+        # 完成后再次调用会重新执行
+        assert await flight.do("k", call) == "ok"
+        assert call.calls == 2
+    asyncio.run(run())
+
+
+def test_cancelled_leader():
+    """发起方被取消时共享任务继续执行，其他调用方拿到结果"""
+    async def run():
+        flight = SingleFlight()
+        call = SlowCall()
+        leader = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        assert leader.cancelled()
+        call.release.set()
+        assert await follower == "ok"
+        assert call.calls == 1
+    asyncio.run(run())
+
+
+def test_join_wait_timeout():
+    """join 的调用方等待超时不会取消共享任务"""
+    async def run():
+        flight = SingleFlight()
+        call = SlowCall()
+        shared, leader = flight.join("k", call)
+        assert leader
+        done, _ = await asyncio.wait({shared}, timeout=0.01)
+        assert not done and not shared.done()
+
+        joined, leader = flight.join("k", call)
+        assert joined is shared and not leader
+        call.release.set()
+        assert await joined == "ok"
+    asyncio.run(run())
+
+
+def test_exception_shared():
+    """异常传递给所有调用方，之后可以重新执行"""
+    async def run():
+        flight = SingleFlight()
+        call = SlowCall(RuntimeError("boom"))
+        waiters = [asyncio.ensure_future(flight.do("k", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        call.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert call.calls == 1
+        assert flight.stats()["in_flight"] == 0
+    asyncio.run(run())
+
+
+def test_cancelled_task_released():
+    """共享任务本身被取消后释放该键"""
+    async def run():
+        flight = SingleFlight()
+        call = SlowCall()
+        shared, _ = flight.join("k", call)
+        await asyncio.sleep(0)
+        shared.cancel()
+        await asyncio.gather(shared, return_exceptions=True)
+        assert flight.stats()["in_flight"] == 0
+        shared, leader = flight.join("k", call)
+        assert leader
+        call.release.set()
+        assert await shared == "ok"
+    asyncio.run(run())
+
+
+def main() -> int:
+    """主测试函数"""
+    tests = [
+        test_coalesce,
+        test_cancelled_leader,
+        test_join_wait_timeout,
+        test_exception_shared,
+        test_cancelled_task_released,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
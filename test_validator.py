@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""工具参数校验（ArgumentValidator）测试"""
+
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径（src 内使用相对导入）
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.tool_index.validator import ArgumentValidator
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "count": {"type": "integer", "minimum": 1},
+        "verbose": {"type": "boolean"},
+        "ratio": {"type": "number"},
+        "name": {"type": "string"},
+        "tags": {"type": "array", "items": {"type": "string"}},
+        "filter": {
+            "type": "object",
+            "properties": {
+                "ids": {"type": "array", "items": {"type": "integer"}},
+                "state": {"type": "string", "enum": ["open", "closed"]}
+            },
+            "required": ["state"]
+        }
+    },
+    "required": ["count"]
+}
+
+
+def test_coerce_scalars():
+    """字符串按 schema 转换为整数、布尔值和数字"""
+    validator = ArgumentValidator(SCHEMA)
+    arguments = {"count": "5", "verbose": "true", "ratio": "0.5", "name": 42}
+    coerced = validator.coerce(arguments)
+    assert coerced == {"count": 5, "verbose": True, "ratio": 0.5, "name": "42"}
+    assert arguments["count"] == "5"  # 不修改传入的字典
+    assert validator.coerce({"count": "off", "verbose": "no"}) == {"count": "off", "verbose": False}
+    assert validator.coerce({"count": 3.0}) == {"count": 3}
+    assert validator.validate(coerced) == []
+
+
+def test_coerce_nested():
+    """JSON 字符串和嵌套结构按子 schema 转换"""
+    validator = ArgumentValidator(SCHEMA)
+    coerced = validator.coerce({"count": "1", "tags": '["a", "b"]', "filter": {"ids": ["1", "2"], "state": "open"}})
+    assert coerced == {"count": 1, "tags": ["a", "b"], "filter": {"ids": [1, 2], "state": "open"}}
+    assert validator.validate(coerced) == []
+
+
+def test_nested_error_paths():
+    """嵌套错误返回 a.b[0] 形式的位置"""
+    validator = ArgumentValidator(SCHEMA)
+    errors = validator.validate({"count": 0, "filter": {"ids": [1, "x"], "state": "merged"}})
+    by_path = {error["path"]: error for error in errors}
+    assert set(by_path) == {"count", "filter.ids[1]", "filter.state"}
+    assert by_path["count"]["validator"] == "minimum"
+    assert by_path["filter.ids[1]"]["expected"] == "integer"
+    assert by_path["filter.state"]["expected"] == ["open", "closed"]
+
+
+def test_missing_required():
+    """缺少必需参数作为普通的校验错误返回"""
+    validator = ArgumentValidator(SCHEMA)
+    assert validator.missing_required({}) == ["count"]
+    errors = validator.validate({"filter": {}})
+    assert {(error["path"], error["validator"]) for error in errors} == {("", "required"), ("filter", "required")}
+    assert validator.required_errors({}) == [
+        {"path": "", "message": "'count' is a required property", "validator": "required", "expected": ["count"]}
+    ]
+
+
+def test_non_object_arguments():
+    """参数不是对象时返回类型错误"""
+    errors = ArgumentValidator(SCHEMA).validate(["count"])
+    assert errors[0]["validator"] == "type"
+    assert errors[0]["expected"] == "object"
+
+
+def test_broken_schema_falls_back():
+    """schema 本身有误时退化为只检查必需参数"""
+    validator = ArgumentValidator({"type": "object", "properties": {"a": {"type": "no-such-type"}}, "required": ["a"]})
+    assert validator.validate({"a": 1}) == []
+    assert validator.validate({})[0]["validator"] == "required"
+
+
+def main() -> int:
+    """主测试函数"""
+    tests = [
+        test_coerce_scalars,
+        test_coerce_nested,
+        test_nested_error_paths,
+        test_missing_required,
+        test_non_object_arguments,
+        test_broken_schema_falls_back,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✓ {test.__doc__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {test.__doc__}: {e}")
+    print(f"通过: {len(tests) - failed}/{len(tests)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())